@@ -1,20 +1,292 @@
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
 import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from anyio import CapacityLimiter, to_thread
 from dotenv import load_dotenv
+from app.utils.metrics import METRICS_ENABLED, db_pool_acquire_duration, db_query_duration, db_query_errors_total
+from app.utils.slow_queries import slow_query_log
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Conexión a la base de datos
-def get_db_connection():
+# Configuración del pool de conexiones
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Segundos de inactividad tras los cuales se valida la conexión con SELECT 1
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    pass
+
+
+_OPERATION = re.compile(r"\s*(\w+)")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+(\w+)", re.IGNORECASE)
+# Etiquetas ya calculadas por texto SQL (las consultas se repiten)
+_statement_labels = {}
+STATEMENT_LABELS_MAX = 2048
+
+
+# (operación, tabla) de una consulta para las métricas. Las sentencias
+# preparadas (EXECUTE nombre) se etiquetan con el SQL registrado.
+def statement_labels(query) -> tuple:
+    labels = _statement_labels.get(query)
+    if labels is not None:
+        return labels
+
+    if isinstance(query, bytes):
+        text = query[:2000].decode(errors="replace")
+    elif isinstance(query, str):
+        text = query
+    else:
+        return ("OTRA", "")
+
+    operation = _OPERATION.match(text)
+    operation = operation.group(1).upper() if operation else "OTRA"
+    labels = None
+    if operation == "EXECUTE":
+        from app.config.prepared_statements import prepared_statements
+        parts = text.split(None, 2)
+        try:
+            labels = statement_labels(prepared_statements.sql(parts[1]))
+        except (IndexError, KeyError):
+            pass
+    if labels is None:
+        table = _TABLE.search(text)
+        labels = (operation, table.group(1).lower() if table else "")
+
+    # Las de execute_values llegan como bytes con los valores incluidos: no se guardan
+    if isinstance(query, str) and len(_statement_labels) < STATEMENT_LABELS_MAX:
+        _statement_labels[query] = labels
+    return labels
+
+
+# Cursor que mide cada consulta para /metrics y registra las lentas.
+# Se usa en todas las conexiones si las métricas o el registro están activos.
+class TimedCursor(psycopg2.extensions.cursor):
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().execute(query, vars)
+        except psycopg2.Error as e:
+            db_query_errors_total.inc(*statement_labels(query))
+            error = e.pgcode or type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            labels = statement_labels(query)
+            db_query_duration.observe(elapsed, *labels)
+            if elapsed >= slow_query_log.threshold:
+                self._record_slow(query, vars, elapsed, labels, error)
+
+    # error: código SQLSTATE (o clase) si la sentencia falló; se registra pero no se explica
+    def _record_slow(self, query, vars, elapsed, labels, error=None):
+        sql = name = None
+        # Sentencia preparada: se registra (y se explica) su SQL con los parámetros
+        if isinstance(query, str) and query.startswith("EXECUTE "):
+            from app.config.prepared_statements import prepared_statements
+            name = query.split()[1]
+            try:
+                sql = prepared_statements.sql(name)
+            except KeyError:
+                name = None
+        try:
+            slow_query_log.record(self, query, vars, elapsed, labels, sql, name, error)
+        except Exception as e:
+            print(f"No se pudo registrar una consulta lenta: {e}")
+
+
+# Parámetros de conexión
+def _connection_kwargs():
+    extra = {"cursor_factory": TimedCursor} if METRICS_ENABLED or slow_query_log.enabled else {}
     url = os.getenv("DATABASE_URL")
     if url:
-        return psycopg2.connect(url)
-    
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        database=os.getenv("DB_NAME"),
-        port="5432"
-    )
+        return {"dsn": url, **extra}
+
+    return {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME"),
+        "port": "5432",
+        **extra
+    }
+
+
+# Conexión directa a la base de datos (sin pool)
+def get_db_connection():
+    return psycopg2.connect(**_connection_kwargs())
+
+
+# Pool de conexiones compartido por todo el proceso
+class DatabasePool:
+
+    def __init__(self, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX, timeout: float = DB_POOL_TIMEOUT):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        # Limita las conexiones prestadas para poder esperar con timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "discarded": 0,
+            "healthchecks": 0,
+            "wait_time_total": 0.0,
+        }
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(
+                        self.minconn, self.maxconn, **_connection_kwargs()
+                    )
+        return self._pool
+
+    # Verifica que una conexión siga siendo utilizable
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+
+        # Conexiones recién abiertas no necesitan validación
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < DB_POOL_HEALTHCHECK_IDLE:
+            return True
+
+        self._stats["healthchecks"] += 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, pool, conn):
+        self._stats["discarded"] += 1
+        self._last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+
+    def getconn(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._stats["timeouts"] += 1
+            raise PoolTimeoutError(f"No hay conexiones disponibles tras {self.timeout}s de espera")
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                self._discard(pool, conn)
+                conn = pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        wait = time.monotonic() - start
+        self._stats["checkouts"] += 1
+        self._stats["wait_time_total"] += wait
+        db_pool_acquire_duration.observe(wait)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            pool = self._get_pool()
+            if conn.closed:
+                self._discard(pool, conn)
+                return
+
+            # Nunca devolver al pool una transacción abierta
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    self._discard(pool, conn)
+                    return
+
+            self._last_used[id(conn)] = time.monotonic()
+            pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        pool = self._pool
+        in_use = len(pool._used) if pool else 0
+        available = len(pool._pool) if pool else 0
+        checkouts = self._stats["checkouts"]
+        return {
+            "min": self.minconn,
+            "max": self.maxconn,
+            "en_uso": in_use,
+            "disponibles": available,
+            "abiertas": in_use + available,
+            "checkouts": checkouts,
+            "timeouts": self._stats["timeouts"],
+            "descartadas": self._stats["discarded"],
+            "healthchecks": self._stats["healthchecks"],
+            "espera_promedio_ms": (self._stats["wait_time_total"] / checkouts * 1000) if checkouts else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+
+
+db_pool = DatabasePool()
+
+
+# Préstamo de una conexión del pool.
+# Las transacciones que queden abiertas (p. ej. por un error) se revierten al devolverla.
+@contextmanager
+def db_connection():
+    conn = db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        db_pool.putconn(conn)
+
+
+def get_pool_stats() -> dict:
+    return db_pool.stats()
+
+
+def close_db_pool():
+    db_pool.close()
+
+
+# Limitador de hilos para consultas; se crea dentro del event loop
+_db_limiter = None
+
+
+# Un turno del limitador por conexión del pool. Quien retiene una conexión
+# fuera de run_db (p. ej. una exportación en streaming) también ocupa un turno.
+def db_limiter() -> CapacityLimiter:
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = CapacityLimiter(DB_POOL_MAX)
+    return _db_limiter
+
+
+# Ejecuta una función síncrona de acceso a datos fuera del event loop.
+# El número de hilos concurrentes coincide con el tamaño máximo del pool,
+# así las peticiones esperan turno sin agotar el timeout de checkout.
+async def run_db(func, *args, **kwargs):
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=db_limiter())
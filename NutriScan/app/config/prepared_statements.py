@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+import threading
+import weakref
+
+# Sentencias preparadas del lado del servidor (PREPARE/EXECUTE).
+# Desactivar con DB_PREPARED_STATEMENTS=0 si hay un pooler en modo transacción
+# (p. ej. PgBouncer) entre la API y PostgreSQL.
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "1") == "1"
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+# Convierte los marcadores %s de psycopg2 en $1, $2... para PREPARE
+def to_server_params(sql: str):
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(0) == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(replace, sql), count
+
+
+# Registro de sentencias con nombre. Cada conexión del pool prepara una
+# sentencia la primera vez que la ejecuta (PostgreSQL la analiza y planifica
+# una sola vez por sesión) y después solo envía EXECUTE nombre(parámetros).
+# Las conexiones nuevas o reemplazadas por el pool empiezan sin sentencias.
+class PreparedStatements:
+
+    def __init__(self, enabled: bool = DB_PREPARED_STATEMENTS):
+        self.enabled = enabled
+        self._statements = {}
+        self._names_by_sql = {}
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    # Registra una sentencia y devuelve su nombre (idempotente).
+    # Sin nombre se deriva uno del texto SQL.
+    def register(self, sql: str, name: str = None) -> str:
+        with self._lock:
+            if name is None:
+                name = self._names_by_sql.get(sql) or "ps_" + hashlib.md5(sql.encode()).hexdigest()[:16]
+            current = self._statements.get(name)
+            if current is not None and current["sql"] != sql:
+                raise ValueError(f"La sentencia '{name}' ya está registrada con otro SQL")
+            if current is None:
+                server_sql, count = to_server_params(sql)
+                self._statements[name] = {"sql": sql, "server_sql": server_sql, "params": count}
+                self._names_by_sql[sql] = name
+        return name
+
+    def sql(self, name: str) -> str:
+        return self._statements[name]["sql"]
+
+    def _ensure_prepared(self, cursor, name: str, statement: dict):
+        conn = cursor.connection
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} AS {statement['server_sql']}")
+            prepared.add(name)
+
+    # Ejecuta una sentencia registrada en el cursor
+    def execute(self, cursor, name: str, params=()):
+        statement = self._statements[name]
+        if not self.enabled:
+            cursor.execute(statement["sql"], params)
+            return
+
+        self._ensure_prepared(cursor, name, statement)
+        if statement["params"]:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * statement['params'])})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+    def stats(self) -> dict:
+        return {
+            "habilitadas": self.enabled,
+            "registradas": len(self._statements),
+            "conexiones": len(self._prepared),
+        }
+
+
+prepared_statements = PreparedStatements()
@@ -0,0 +1,89 @@
+import threading
+from app.config.db_config import db_connection
+
+# Columna usada para el borrado lógico (Soft Delete)
+SOFT_DELETE_COLUMN = "estado"
+
+
+# Metadatos de una tabla
+class TableSchema:
+
+    def __init__(self, name: str, columns: list, primary_key: str = None):
+        self.name = name
+        self.columns = columns
+        self.primary_key = primary_key
+        self.soft_delete_column = SOFT_DELETE_COLUMN if SOFT_DELETE_COLUMN in columns else None
+        # Texto SQL ya construido por operación; se descarta junto con el esquema al refrescarlo
+        self.statements = {}
+
+    def statement(self, key, build):
+        sql = self.statements.get(key)
+        if sql is None:
+            sql = self.statements[key] = build()
+        return sql
+
+    def __repr__(self):
+        return f"TableSchema({self.name!r}, pk={self.primary_key!r}, columns={len(self.columns)})"
+
+
+# Registro de metadatos de las tablas del esquema público.
+# Se carga una vez (al arrancar o en el primer uso) y se puede refrescar bajo demanda.
+class SchemaRegistry:
+
+    def __init__(self, schema: str = "public"):
+        self.schema = schema
+        self._tables = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT table_name, column_name
+                FROM information_schema.columns
+                WHERE table_schema = %s
+                ORDER BY table_name, ordinal_position
+            """, (self.schema,))
+            columns = {}
+            for table, column in cursor.fetchall():
+                columns.setdefault(table, []).append(column)
+
+            cursor.execute("""
+                SELECT tc.table_name, kcu.column_name
+                FROM information_schema.table_constraints tc
+                JOIN information_schema.key_column_usage kcu
+                    ON tc.constraint_name = kcu.constraint_name
+                    AND tc.table_schema = kcu.table_schema
+                WHERE tc.table_schema = %s AND tc.constraint_type = 'PRIMARY KEY'
+            """, (self.schema,))
+            primary_keys = dict(cursor.fetchall())
+
+        tables = {
+            name: TableSchema(name, cols, primary_keys.get(name))
+            for name, cols in columns.items()
+        }
+
+        with self._lock:
+            self._tables = tables
+            self._loaded = True
+        return tables
+
+    def refresh(self):
+        return self.load()
+
+    def get(self, table: str) -> TableSchema:
+        if not self._loaded:
+            self.load()
+        schema = self._tables.get(table)
+        if schema is None:
+            raise KeyError(f"La tabla '{table}' no existe en el esquema '{self.schema}'")
+        return schema
+
+    def tables(self) -> list:
+        if not self._loaded:
+            self.load()
+        return sorted(self._tables)
+
+
+schema_registry = SchemaRegistry()
@@ -1,25 +1,87 @@
 from fastapi import HTTPException, UploadFile
-from app.utils.ai_utils import YOLOHandler
+from starlette.concurrency import run_in_threadpool
+from app.utils.ai_utils import YOLOHandler, InferenceError
+from app.utils.inference_pool import inference_pool
+from app.utils.model_manager import model_manager, LOADING, PENDING
+from app.utils.result_cache import result_cache
+from app.utils.food_catalog import food_catalog
 from app.controllers.perfiles_clinicos_controller import Perfiles_clinicosController
 from app.controllers.alimentos_controller import AlimentosController
 from app.controllers.registro_consumo_controller import Registro_consumoController
+from app.config.db_config import db_connection, run_db
 from datetime import datetime
 import os
+import time
 
 class AIController:
     def __init__(self):
-        # El modelo se cargará/descargará al iniciar el controlador
+        # El modelo lo carga el ModelManager en el arranque de la API
         self.yolo = YOLOHandler()
         self.perfil_controller = Perfiles_clinicosController()
         self.alimento_controller = AlimentosController()
         self.consumo_controller = Registro_consumoController()
 
+    # Guardar el biotipo en el perfil clínico del usuario
+    def _save_biotype(self, user_id: int, biotype: str, confidence: float):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id_perfil FROM perfiles_clinicos WHERE id_usuario = %s", (user_id,))
+            row = cursor.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail="El usuario no tiene un perfil clínico creado")
+        
+        id_perfil = row[0]
+        
+        # Actualizamos
+        data_to_update = {
+            "biotipo": biotype,
+            "confianza_ia": confidence,
+            "fecha_actualizacion": datetime.now()
+        }
+        self.perfil_controller.update(id_perfil, data_to_update)
+
+    # Mientras el modelo se carga y calienta no se aceptan análisis
+    def _check_model_ready(self):
+        if model_manager.state == PENDING:
+            model_manager.start()
+        if model_manager.state in (PENDING, LOADING):
+            raise HTTPException(
+                status_code=503,
+                detail="El modelo de IA se está cargando, intente de nuevo en unos segundos",
+                headers={"Retry-After": "5"}
+            )
+
+    # Ejecuta el análisis en el pool de inferencia, consultando antes la caché
+    # de resultados (misma imagen o casi idéntica con la misma versión del modelo)
+    # Los fallos de inferencia no se cachean: responden 500 y la siguiente
+    # petición con la misma imagen vuelve a intentarlo
+    async def _run_cached(self, task: str, func, image_bytes: bytes):
+        try:
+            # En modo simulación no hay versión de modelo y no se cachea
+            if not model_manager.is_ready():
+                return await inference_pool.run(func, image_bytes)
+            
+            start = time.perf_counter()
+            cached, key = await run_in_threadpool(result_cache.lookup, task, model_manager.version, image_bytes)
+            if cached is not None:
+                return cached, {"cache": round((time.perf_counter() - start) * 1000, 2)}
+            
+            result, timings = await inference_pool.run(func, image_bytes)
+        except InferenceError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        result_cache.store(key, result)
+        return result, timings
+
     async def analyze_biotype(self, user_id: int, file: UploadFile):
+        self._check_model_ready()
+        
         # Leer el contenido del archivo
         image_bytes = await file.read()
         
         # Ejecutar análisis
-        biotype, confidence = self.yolo.detect_and_analyze_biotype(image_bytes)
+        # Se ejecuta en el pool de inferencia (fuera del event loop, con cola acotada)
+        (biotype, confidence), timings = await self._run_cached("biotype", self.yolo.detect_and_analyze_biotype, image_bytes)
         
         if not biotype:
             raise HTTPException(status_code=400, detail="No se pudo detectar una persona en la foto")
@@ -34,41 +96,26 @@ class AIController:
             # Para fines de demostración, asumiremos que el controller de perfiles
             # tiene un método para actualizar por id_usuario o buscaremos el ID primero.
             
-            # Buscamos el ID del perfil clínico asignado a este usuario
-            from app.config.db_config import get_db_connection
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT id_perfil FROM perfiles_clinicos WHERE id_usuario = %s", (user_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail="El usuario no tiene un perfil clínico creado")
-            
-            id_perfil = row[0]
-            
-            # Actualizamos
-            data_to_update = {
-                "biotipo": biotype,
-                "confianza_ia": confidence,
-                "fecha_actualizacion": datetime.now()
-            }
-            self.perfil_controller.update(id_perfil, data_to_update)
-            conn.close()
+            # Buscamos el ID del perfil clínico asignado a este usuario y lo actualizamos
+            await run_db(self._save_biotype, user_id, biotype, confidence)
             
             return {
                 "resultado": "Análisis completado",
                 "biotipo_detectado": biotype,
-                "confianza": f"{confidence:.2f}%"
+                "confianza": f"{confidence:.2f}%",
+                "tiempos_ms": timings
             }
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al guardar biótipo: {str(e)}")
 
     async def analyze_food(self, user_id: int, file: UploadFile):
+        self._check_model_ready()
+        
         image_bytes = await file.read()
         
         # Detectar comidas
-        detections = self.yolo.detect_food(image_bytes)
+        detections, timings = await self._run_cached("food", self.yolo.detect_food, image_bytes)
         
         if not detections:
             raise HTTPException(status_code=400, detail="No se detectaron alimentos reconocibles")
@@ -77,50 +124,28 @@ class AIController:
         best_detection = max(detections, key=lambda x: x["confidence"])
         label = best_detection["label"]
         
-        # Buscar el alimento en nuestra BD para obtener calorías reales
-        from app.config.db_config import get_db_connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Búsqueda difusa por el nombre del label de YOLO (traducido o mapeado)
-        food_translations = {
-            "apple": "Manzana",
-            "banana": "Banano",
-            "orange": "Naranja",
-            "sandwich": "Sandwich",
-            "broccoli": "Brocoli",
-            "pizza": "Pizza",
-            "cake": "Pastel",
-            "donut": "Dona",
-            "hot dog": "Perro Caliente",
-            "carrot": "Zanahoria"
-        }
-        
-        translated_name = food_translations.get(label, label)
-        cursor.execute("SELECT * FROM alimentos WHERE nombre ILIKE %s AND estado = 'Activo' LIMIT 1", (f"%{translated_name}%",))
-        columns = [desc[0] for desc in cursor.description]
-        food_db = cursor.fetchone()
+        # Buscar el alimento en el catálogo en memoria para obtener calorías reales
+        # (etiqueta de YOLO mapeada con config/food_labels.json y búsqueda por prefijo/trigramas)
+        food_data = await run_db(food_catalog.find_label, label)
         
-        if not food_db:
-             conn.close()
+        if not food_data:
              return {
                 "label": label,
                 "confidence": best_detection["confidence"],
                 "mensaje": "Alimento reconocido por IA pero no está en nuestro inventario de calorías.",
-                "calorias_estimadas": 0
+                "calorias_estimadas": 0,
+                "tiempos_ms": timings
             }
-            
-        food_data = dict(zip(columns, food_db))
         
         # Registrar consumo automático si se desea (o solo devolver la info)
         # Por ahora solo devolvemos la info para confirmación del usuario
         
-        conn.close()
         return {
             "alimento_detectado": food_data["nombre"],
             "calorias": food_data["calorias"],
             "proteinas": food_data["proteinas_g"],
             "carbohidratos": food_data["carbohidratos_g"],
             "grasas": food_data["grasas_g"],
-            "confianza_ia": best_detection["confidence"]
+            "confianza_ia": best_detection["confidence"],
+            "tiempos_ms": timings
         }
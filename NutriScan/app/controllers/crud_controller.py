@@ -0,0 +1,195 @@
+import psycopg2
+from fastapi import HTTPException
+from app.config.db_config import db_connection, PoolTimeoutError
+from app.config.schema_registry import schema_registry
+from app.config.prepared_statements import prepared_statements
+from app.utils.pagination import DEFAULT_LIMIT, parse_fields, paginate
+from app.utils.export import check_export_format, stream_query
+from app.utils.table_events import notify_change
+from app.utils.bulk import bulk_insert
+from datetime import datetime
+
+
+# Motor CRUD genérico para las tablas del esquema.
+# Las columnas y la llave primaria vienen del registro de esquema: solo se
+# aceptan columnas existentes. Las consultas de forma fija (listado completo,
+# por id, desactivar) se construyen una vez por tabla y se registran como
+# sentencias preparadas; las que dependen de las columnas que envía el cliente
+# (campos, alta, actualización) se envían como SQL normal para no acumular
+# una sentencia por combinación.
+# Los controladores de cada tabla son subclases con el nombre de la tabla.
+class CrudController:
+
+    def __init__(self, table: str):
+        self.table = table
+
+    # La primera vez lee el esquema de la tabla desde la base de datos
+    def _schema(self):
+        try:
+            return schema_registry.get(self.table)
+        except KeyError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        except PoolTimeoutError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except psycopg2.Error as e:
+            raise HTTPException(status_code=500, detail=f"No se pudo leer el esquema de {self.table}: {e}")
+
+    def _check_columns(self, schema, data: dict):
+        unknown = [c for c in data if c not in schema.columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Columnas no válidas: {', '.join(unknown)}")
+
+    # Nombre de la sentencia preparada para una operación de la tabla
+    def _statement(self, schema, key, build) -> str:
+        return schema.statement(key, lambda: prepared_statements.register(build()))
+
+    def get_all(self, after_id: int = None, limit: int = DEFAULT_LIMIT, fields: str = None):
+        schema = self._schema()
+        pk = schema.primary_key
+        columns = parse_fields(fields, schema.columns, pk)
+
+        # Paginación por llave (keyset): filas con id mayor al cursor recibido
+        def build():
+            conditions = []
+            if schema.soft_delete_column:
+                conditions.append(f"{schema.soft_delete_column} != 'Inactivo'")
+            if after_id is not None:
+                conditions.append(f"{pk} > %s")
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            return f"SELECT {', '.join(columns)} FROM {self.table} {where} ORDER BY {pk} ASC LIMIT %s"
+
+        params = (after_id, limit + 1) if after_id is not None else (limit + 1,)
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                # Solo se preparan (y guardan) las consultas de todas las columnas;
+                # las de un subconjunto de campos se envían como SQL normal
+                if fields:
+                    cursor.execute(build(), params)
+                else:
+                    query = self._statement(schema, ("get_all", after_id is not None), build)
+                    prepared_statements.execute(cursor, query, params)
+                result = cursor.fetchall()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=str(err))
+
+        return paginate([dict(zip(columns, row)) for row in result], pk, limit)
+
+    def export(self, fmt: str = "ndjson"):
+        # Exportación completa en streaming mediante un cursor del lado del servidor
+        check_export_format(fmt)
+        schema = self._schema()
+
+        def build():
+            where = f"WHERE {schema.soft_delete_column} != 'Inactivo'" if schema.soft_delete_column else ""
+            return f"SELECT * FROM {self.table} {where} ORDER BY {schema.primary_key} ASC"
+
+        return stream_query(schema.statement(("export",), build), (), fmt, self.table)
+
+    def get_by_id(self, item_id: int):
+        schema = self._schema()
+        query = self._statement(schema, ("get_by_id",), lambda: (
+            f"SELECT {', '.join(schema.columns)} FROM {self.table} WHERE {schema.primary_key} = %s"
+        ))
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                prepared_statements.execute(cursor, query, (item_id,))
+                row = cursor.fetchone()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=str(err))
+
+        if not row:
+            raise HTTPException(status_code=404, detail="No encontrado")
+        return {"resultado": dict(zip(schema.columns, row))}
+
+    def create(self, data: dict):
+        schema = self._schema()
+        self._check_columns(schema, data)
+
+        # Aseguramos de insertar la fecha actual
+        if 'fecha_creacion' in schema.columns and 'fecha_creacion' not in data:
+            data['fecha_creacion'] = datetime.now()
+        if 'fecha_actualizacion' in schema.columns and 'fecha_actualizacion' not in data:
+            data['fecha_actualizacion'] = datetime.now()
+
+        keys = tuple(sorted(data))
+        query = (
+            f"INSERT INTO {self.table} ({', '.join(keys)}) VALUES ({', '.join(['%s'] * len(keys))}) "
+            f"RETURNING {', '.join(schema.columns)}"
+        )
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, tuple(data[k] for k in keys))
+                new_row = dict(zip(schema.columns, cursor.fetchone()))
+                conn.commit()
+        except psycopg2.Error as err:
+            # El rollback lo realiza db_connection al devolver la conexión al pool
+            raise HTTPException(status_code=500, detail=str(err))
+
+        notify_change(self.table, "create", new_row)
+        return {"resultado": "Creado con éxito", "data": new_row}
+
+    def bulk_create(self, rows: list, conflict_columns: list = None, all_or_nothing: bool = False):
+        result = bulk_insert(self.table, rows, conflict_columns, all_or_nothing, self._schema())
+        # Solo se invalidan cachés si el lote escribió alguna fila
+        if result["guardadas"]:
+            notify_change(self.table, "bulk")
+        return result
+
+    def update(self, item_id: int, data: dict):
+        schema = self._schema()
+        self._check_columns(schema, data)
+
+        # Forzar actualización de fecha
+        if 'fecha_actualizacion' in schema.columns:
+            data['fecha_actualizacion'] = datetime.now()
+
+        keys = tuple(sorted(data))
+        query = (
+            f"UPDATE {self.table} SET {', '.join(f'{k} = %s' for k in keys)} "
+            f"WHERE {schema.primary_key} = %s RETURNING {', '.join(schema.columns)}"
+        )
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (*(data[k] for k in keys), item_id))
+                updated = cursor.fetchone()
+                if updated is None:
+                    raise HTTPException(status_code=404, detail="No encontrado")
+                conn.commit()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=str(err))
+
+        updated_row = dict(zip(schema.columns, updated))
+        notify_change(self.table, "update", updated_row)
+        return {"resultado": "Actualizado con éxito", "data": updated_row}
+
+    def deactivate(self, item_id: int):
+        schema = self._schema()
+        if not schema.soft_delete_column:
+            raise HTTPException(status_code=405, detail=f"La tabla {self.table} no admite borrado lógico")
+
+        # Aplicar Soft Delete (Estado = 'Inactivo')
+        query = self._statement(schema, ("deactivate",), lambda: (
+            f"UPDATE {self.table} SET {schema.soft_delete_column} = 'Inactivo', fecha_actualizacion = NOW() "
+            f"WHERE {schema.primary_key} = %s"
+        ))
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                prepared_statements.execute(cursor, query, (item_id,))
+                if cursor.rowcount == 0:
+                    raise HTTPException(status_code=404, detail="No encontrado")
+                conn.commit()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=str(err))
+
+        notify_change(self.table, "deactivate", {schema.primary_key: item_id})
+        return {"resultado": "Desactivado con éxito (Soft Delete)"}
@@ -1,131 +1,7 @@
 
-import psycopg2
-from fastapi import HTTPException
-from app.config.db_config import get_db_connection
-from datetime import datetime
+from app.controllers.crud_controller import CrudController
 
-class HistorialController:
-    
-    def get_all(self):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Revisar si existe la columna de estado para filtrar
-            cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name='historial' AND column_name='estado'")
-            has_estado = cursor.fetchone() is not None
-            
-            if has_estado:
-                cursor.execute("SELECT * FROM historial WHERE estado != 'Inactivo' ORDER BY id_historial ASC")
-            else:
-                cursor.execute("SELECT * FROM historial ORDER BY id_historial ASC")
-                
-            columns = [desc[0] for desc in cursor.description]
-            result = cursor.fetchall()
-            
-            return {"resultado": [dict(zip(columns, row)) for row in result]}
-        except psycopg2.Error as err:
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
+class HistorialController(CrudController):
 
-    def get_by_id(self, item_id: int):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM historial WHERE id_historial = %s", (item_id,))
-            columns = [desc[0] for desc in cursor.description]
-            row = cursor.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="No encontrado")
-            return {"resultado": dict(zip(columns, row))}
-        except psycopg2.Error as err:
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
-            
-    def create(self, data: dict):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Aseguramos de insertar la fecha actual
-            if 'fecha_creacion' not in data:
-                data['fecha_creacion'] = datetime.now()
-            if 'fecha_actualizacion' not in data:
-                data['fecha_actualizacion'] = datetime.now()
-                
-            keys = list(data.keys())
-            values = tuple(data.values())
-            
-            placeholders = ", ".join(["%s"] * len(keys))
-            columns = ", ".join(keys)
-            
-            query = f"INSERT INTO historial ({columns}) VALUES ({placeholders}) RETURNING *"
-            cursor.execute(query, values)
-            
-            cols = [desc[0] for desc in cursor.description]
-            new_row = cursor.fetchone()
-            
-            conn.commit()
-            return {"resultado": "Creado con éxito", "data": dict(zip(cols, new_row))}
-        except psycopg2.Error as err:
-            if conn: conn.rollback()
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
-
-    def update(self, item_id: int, data: dict):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Forzar actualización de fecha
-            data['fecha_actualizacion'] = datetime.now()
-            
-            keys = list(data.keys())
-            values = list(data.values())
-            
-            set_clause = ", ".join([f"{k} = %s" for k in keys])
-            values.append(item_id)
-            
-            query = f"UPDATE historial SET {set_clause} WHERE id_historial = %s RETURNING *"
-            cursor.execute(query, tuple(values))
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="No encontrado")
-                
-            cols = [desc[0] for desc in cursor.description]
-            updated_row = cursor.fetchone()
-                
-            conn.commit()
-            return {"resultado": "Actualizado con éxito", "data": dict(zip(cols, updated_row))}
-        except psycopg2.Error as err:
-            if conn: conn.rollback()
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
-
-    def deactivate(self, item_id: int):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Aplicar Soft Delete (Estado = 'Inactivo')
-            cursor.execute(f"UPDATE historial SET estado = 'Inactivo', fecha_actualizacion = NOW() WHERE id_historial = %s", (item_id,))
-                
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="No encontrado")
-                
-            conn.commit()
-            return {"resultado": "Desactivado con éxito (Soft Delete)"}
-        except psycopg2.Error as err:
-            if conn: conn.rollback()
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
+    def __init__(self):
+        super().__init__("historial")
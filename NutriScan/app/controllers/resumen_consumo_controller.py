@@ -0,0 +1,83 @@
+import os
+import psycopg2
+from datetime import date, timedelta
+from fastapi import HTTPException
+from app.config.db_config import db_connection
+from app.config.prepared_statements import prepared_statements
+
+# Máximo de días por consulta de rango
+ROLLUP_MAX_DAYS = int(os.getenv("ROLLUP_MAX_DAYS", "366"))
+
+NUTRIENTS = ("calorias", "proteinas_g", "carbohidratos_g", "grasas_g")
+
+# Los totales los mantienen los triggers de sql/resumen_consumo_diario.sql
+RANGE_QUERY = prepared_statements.register("""
+    SELECT fecha, ROUND(calorias, 2), ROUND(proteinas_g, 2), ROUND(carbohidratos_g, 2),
+           ROUND(grasas_g, 2), registros
+    FROM resumen_consumo_diario
+    WHERE id_usuario = %s AND fecha BETWEEN %s AND %s
+    ORDER BY fecha
+""", "resumen_consumo_rango")
+
+
+# Rango de fechas de un periodo que contiene la fecha dada (semana ISO de lunes a domingo)
+def period_range(period: str, day: date):
+    if period == "dia":
+        return day, day
+    if period == "semana":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == "mes":
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    raise HTTPException(status_code=400, detail="Periodo no válido: use dia, semana o mes")
+
+
+# Totales de consumo por usuario y día, leídos del resumen precalculado
+class ResumenConsumoController:
+
+    def get_range(self, user_id: int, desde: date, hasta: date):
+        if hasta < desde:
+            raise HTTPException(status_code=400, detail="La fecha final es anterior a la inicial")
+        if (hasta - desde).days + 1 > ROLLUP_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"Máximo {ROLLUP_MAX_DAYS} días por consulta")
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                prepared_statements.execute(cursor, RANGE_QUERY, (user_id, desde, hasta))
+                rows = cursor.fetchall()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=str(err))
+
+        days = [dict(zip(("fecha", *NUTRIENTS, "registros"), row)) for row in rows]
+        totals = {key: sum(day[key] for day in days) for key in (*NUTRIENTS, "registros")}
+        # Promedio sobre los días con algún registro
+        averages = {key: round(totals[key] / len(days), 2) if days else 0 for key in NUTRIENTS}
+        return {
+            "id_usuario": user_id,
+            "desde": desde,
+            "hasta": hasta,
+            "totales": totals,
+            "promedio_diario": averages,
+            "dias_con_registros": len(days),
+            "dias": days
+        }
+
+    def get_period(self, user_id: int, period: str, day: date = None):
+        desde, hasta = period_range(period, day or date.today())
+        return {"periodo": period, **self.get_range(user_id, desde, hasta)}
+
+    # Recalcula el resumen desde registro_consumo (backfills y reparaciones)
+    def rebuild(self, user_id: int = None, desde: date = None, hasta: date = None):
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT recalcular_resumen_consumo(%s, %s, %s)", (user_id, desde, hasta))
+                days = cursor.fetchone()[0]
+                conn.commit()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=str(err))
+
+        return {"resultado": f"Resumen recalculado: {days} días", "dias": days}
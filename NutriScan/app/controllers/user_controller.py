@@ -1,231 +1,285 @@
 import psycopg2
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
-from app.config.db_config import get_db_connection
+from app.config.db_config import db_connection, run_db
+from app.config.prepared_statements import prepared_statements
 from app.models.user_model import User
-from app.utils.auth import verify_password
+from app.utils.password_pool import password_pool
+from app.utils.pagination import DEFAULT_LIMIT, parse_fields, paginate
+
+# Campos expuestos en el listado de usuarios y su expresión SQL
+USER_FIELDS = {
+    'id': 'u.id_usuario',
+    'identificacion': 'u.identificacion',
+    'nombre': 'u.nombre_completo',
+    'email': 'u.email',
+    'telefono': 't.numero',
+    'genero': 'u.genero',
+    'pais': 'u.pais',
+    'departamento': 'u.departamento',
+    'ciudad': 'u.ciudad',
+    'rol': 'r.nombre_rol',
+    'biotipo': 'pc.biotipo',
+    'estado': 'u.estado',
+    'fecha_creacion': 'u.fecha_creacion'
+}
+
+USER_JOINS = {
+    'rol': "JOIN roles r ON u.id_rol = r.id_rol",
+    'biotipo': "LEFT JOIN perfiles_clinicos pc ON u.id_usuario = pc.id_usuario",
+    'telefono': "LEFT JOIN telefono t ON u.id_usuario = t.id_usuario AND t.estado = 'Activo'"
+}
+
+# Valores por defecto para campos vacíos
+USER_DEFAULTS = {
+    'telefono': "Sin registro",
+    'pais': "No definido",
+    'departamento': "No definido",
+    'ciudad': "No definido"
+}
+
+# Consultas del login y de la sesión, preparadas una vez por conexión
+LOGIN_QUERY = prepared_statements.register("""
+    SELECT id_usuario, email, password_hash, nombre_completo, id_rol
+    FROM usuarios
+    WHERE email = %s AND estado = 'Activo'
+""", "login_usuario")
+SESSION_QUERY = prepared_statements.register(
+    "SELECT id_usuario, email, id_rol FROM usuarios WHERE id_usuario = %s AND estado = 'Activo'",
+    "sesion_usuario"
+)
 
 # Controlador de usuarios
 class UserController:
     
     # Crear usuario y perfil clínico
     def create_user(self, user: User):   
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            query = """
-                INSERT INTO usuarios 
-                (identificacion, nombre_completo, email, genero, pais, departamento, ciudad, password_hash, id_rol) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) 
-                RETURNING id_usuario
-            """
-            values = (
-                user.identificacion, 
-                user.nombre_completo, 
-                user.email, 
-                user.genero,
-                user.pais,
-                user.departamento,
-                user.ciudad,
-                user.password_hash, 
-                user.id_rol
-            )
-            
-            cursor.execute(query, values)
-            new_id = cursor.fetchone()[0]
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                
+                query = """
+                    INSERT INTO usuarios 
+                    (identificacion, nombre_completo, email, genero, pais, departamento, ciudad, password_hash, id_rol) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) 
+                    RETURNING id_usuario
+                """
+                values = (
+                    user.identificacion, 
+                    user.nombre_completo, 
+                    user.email, 
+                    user.genero,
+                    user.pais,
+                    user.departamento,
+                    user.ciudad,
+                    user.password_hash, 
+                    user.id_rol
+                )
+                
+                cursor.execute(query, values)
+                new_id = cursor.fetchone()[0]
 
-            # Insertar teléfono
-            if user.telefono:
-                cursor.execute("INSERT INTO telefono (id_usuario, numero, tipo) VALUES (%s, %s, 'Movil')", (new_id, user.telefono))
-            
-            # Crear perfil clínico vacío
-            cursor.execute("INSERT INTO perfiles_clinicos (id_usuario) VALUES (%s)", (new_id,))
+                # Insertar teléfono
+                if user.telefono:
+                    cursor.execute("INSERT INTO telefono (id_usuario, numero, tipo) VALUES (%s, %s, 'Movil')", (new_id, user.telefono))
+                
+                # Crear perfil clínico vacío
+                cursor.execute("INSERT INTO perfiles_clinicos (id_usuario) VALUES (%s)", (new_id,))
+                
+                conn.commit()
+                return {"resultado": "Usuario y Perfil creados con éxito", "id": new_id}
             
-            conn.commit()
-            return {"resultado": "Usuario y Perfil creados con éxito", "id": new_id}
-        
         except psycopg2.Error as err:
-            if conn: conn.rollback()
             if err.pgcode == '23505':
                 raise HTTPException(status_code=400, detail="Error: Ya existe un usuario con esa identificación o email.")
             raise HTTPException(status_code=500, detail=f"Error de base de datos: {str(err)}")
-        finally:
-            if conn: conn.close()
 
-    # Obtener lista de usuarios activos
-    def get_active_users(self):
-        conn = None
+    # Obtener lista de usuarios activos (paginada por id_usuario)
+    def get_active_users(self, after_id: int = None, limit: int = DEFAULT_LIMIT, fields: str = None):
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            keys = parse_fields(fields, USER_FIELDS, "id")
             
-            query = """
+            # Solo se unen las tablas que aportan campos solicitados
+            joins = [USER_JOINS[key] for key in ("rol", "biotipo", "telefono") if key in keys]
+            conditions = ["u.estado = 'Activo'"]
+            params = []
+            if after_id is not None:
+                conditions.append("u.id_usuario > %s")
+                params.append(after_id)
+            params.append(limit + 1)
+            
+            query = f"""
                 SELECT DISTINCT ON (u.id_usuario) 
-                    u.id_usuario, 
-                    u.identificacion, 
-                    u.nombre_completo, 
-                    u.email, 
-                    t.numero AS telefono, 
-                    u.genero, 
-                    u.pais, 
-                    u.departamento, 
-                    u.ciudad, 
-                    r.nombre_rol, 
-                    pc.biotipo, 
-                    u.estado, 
-                    u.fecha_creacion
+                    {", ".join(USER_FIELDS[key] for key in keys)}
                 FROM usuarios u
-                JOIN roles r ON u.id_rol = r.id_rol
-                LEFT JOIN perfiles_clinicos pc ON u.id_usuario = pc.id_usuario
-                LEFT JOIN telefono t ON u.id_usuario = t.id_usuario AND t.estado = 'Activo'
-                WHERE u.estado = 'Activo'
+                {" ".join(joins)}
+                WHERE {" AND ".join(conditions)}
+                ORDER BY u.id_usuario
+                LIMIT %s
             """
-            cursor.execute(query)
-            result = cursor.fetchall()
+            
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                # Solo el listado completo (con y sin cursor) se prepara; los
+                # subconjuntos de campos se envían como SQL normal
+                if fields:
+                    cursor.execute(query, tuple(params))
+                else:
+                    prepared_statements.execute(cursor, prepared_statements.register(query), tuple(params))
+                result = cursor.fetchall()
             
             payload = []
             for data in result:
-                content = {
-                    'id': data[0], 
-                    'identificacion': data[1], 
-                    'nombre': data[2],
-                    'email': data[3], 
-                    'telefono': data[4] if data[4] else "Sin registro",
-                    'genero': data[5], 
-                    'pais': data[6] if data[6] else "No definido",
-                    'departamento': data[7] if data[7] else "No definido",
-                    'ciudad': data[8] if data[8] else "No definido",
-                    'rol': data[9], 
-                    'biotipo': data[10], 
-                    'estado': data[11],
-                    'fecha_creacion': data[12]
-                }
+                content = dict(zip(keys, data))
+                for key, default in USER_DEFAULTS.items():
+                    if key in content and not content[key]:
+                        content[key] = default
                 payload.append(content)
             
-            return {"resultado": jsonable_encoder(payload)}
+            return jsonable_encoder(paginate(payload, "id", limit))
                 
         except psycopg2.Error as err:
             raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
 
     # Actualizar datos de usuario
     def update_user(self, user: User):
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            query = """
-                UPDATE usuarios 
-                SET nombre_completo = %s, email = %s, genero = %s, 
-                    pais = %s, departamento = %s, ciudad = %s,
-                    password_hash = %s, id_rol = %s, fecha_actualizacion = NOW()
-                WHERE id_usuario = %s
-            """
-            values = (
-                user.nombre_completo, 
-                user.email, 
-                user.genero,
-                user.pais,
-                user.departamento,
-                user.ciudad,
-                user.password_hash, 
-                user.id_rol, 
-                user.id
-            )
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                
+                query = """
+                    UPDATE usuarios 
+                    SET nombre_completo = %s, email = %s, genero = %s, 
+                        pais = %s, departamento = %s, ciudad = %s,
+                        password_hash = %s, id_rol = %s, fecha_actualizacion = NOW()
+                    WHERE id_usuario = %s
+                """
+                values = (
+                    user.nombre_completo, 
+                    user.email, 
+                    user.genero,
+                    user.pais,
+                    user.departamento,
+                    user.ciudad,
+                    user.password_hash, 
+                    user.id_rol, 
+                    user.id
+                )
 
-            cursor.execute(query, values)
+                cursor.execute(query, values)
 
-            # Actualizar o insertar teléfono
-            if user.telefono:
-                cursor.execute("SELECT id_telefono FROM telefono WHERE id_usuario = %s", (user.id,))
-                existing_phone = cursor.fetchone()
+                # Actualizar o insertar teléfono
+                if user.telefono:
+                    cursor.execute("SELECT id_telefono FROM telefono WHERE id_usuario = %s", (user.id,))
+                    existing_phone = cursor.fetchone()
+                    
+                    if existing_phone:
+                        cursor.execute("UPDATE telefono SET numero = %s, fecha_actualizacion = NOW() WHERE id_telefono = %s", (user.telefono, existing_phone[0]))
+                    else:
+                        cursor.execute("INSERT INTO telefono (id_usuario, numero, tipo) VALUES (%s, %s, 'Movil')", (user.id, user.telefono))
+                
+                conn.commit()
+                return {"resultado": "Usuario actualizado con éxito"}
                 
-                if existing_phone:
-                    cursor.execute("UPDATE telefono SET numero = %s, fecha_actualizacion = NOW() WHERE id_telefono = %s", (user.telefono, existing_phone[0]))
-                else:
-                    cursor.execute("INSERT INTO telefono (id_usuario, numero, tipo) VALUES (%s, %s, 'Movil')", (user.id, user.telefono))
-            
-            conn.commit()
-            return {"resultado": "Usuario actualizado con éxito"}
-            
         except psycopg2.Error as err:
-            if conn: conn.rollback()
             raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
 
     # Desactivar cuenta de usuario (Soft Delete)
     def deactivate(self, user_id: int):
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE usuarios SET estado = 'Inactivo', fecha_actualizacion = NOW() WHERE id_usuario = %s", (user_id,))
-            conn.commit()
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Usuario no encontrado")
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE usuarios SET estado = 'Inactivo', fecha_actualizacion = NOW() WHERE id_usuario = %s", (user_id,))
+                conn.commit()
                 
-            return {"resultado": "Usuario desactivado con éxito (Soft Delete)"}
+                if cursor.rowcount == 0:
+                    raise HTTPException(status_code=404, detail="Usuario no encontrado")
+                    
+                return {"resultado": "Usuario desactivado con éxito (Soft Delete)"}
         except psycopg2.Error as err:
-            if conn: conn.rollback()
             raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
 
     # Actualizar biotipo del perfil clínico
     def update_biotype(self, user_id: int, biotipo: str, confianza: float):
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE perfiles_clinicos 
-                SET biotipo = %s, confianza_ia = %s, fecha_actualizacion = NOW()
-                WHERE id_usuario = %s
-            """, (biotipo, confianza, user_id))
-            conn.commit()
-            return {"resultado": "Biotipo actualizado por IA"}
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE perfiles_clinicos 
+                    SET biotipo = %s, confianza_ia = %s, fecha_actualizacion = NOW()
+                    WHERE id_usuario = %s
+                """, (biotipo, confianza, user_id))
+                conn.commit()
+                return {"resultado": "Biotipo actualizado por IA"}
         except psycopg2.Error as err:
-            if conn: conn.rollback()
             raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
 
-    # Autenticar usuario por email y contraseña
-    def authenticate_user(self, email: str, password: str):
-        conn = None
+    # Datos de inicio de sesión de un usuario activo (None si no existe)
+    def get_login_user(self, email: str):
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT id_usuario, email, password_hash, nombre_completo, id_rol, estado
-                FROM usuarios
-                WHERE email = %s AND estado = 'Activo'
-            """
-            cursor.execute(query, (email,))
-            result = cursor.fetchone()
-            
-            if not result:
-                raise HTTPException(status_code=401, detail="Credenciales inválidas")
-            
-            user_id, user_email, hashed_password, nombre, rol, estado = result
-            
-            if not verify_password(password, hashed_password):
-                raise HTTPException(status_code=401, detail="Credenciales inválidas")
-            
-            return {
-                "id": user_id,
-                "email": user_email,
-                "nombre": nombre,
-                "id_rol": rol
-            }
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                
+                prepared_statements.execute(cursor, LOGIN_QUERY, (email,))
+                result = cursor.fetchone()
+        except psycopg2.Error as err:
+            raise HTTPException(status_code=500, detail=f"Error de base de datos: {str(err)}")
+        
+        if not result:
+            return None
+        
+        user_id, user_email, hashed_password, nombre, rol = result
+        return {
+            "id": user_id,
+            "email": user_email,
+            "password_hash": hashed_password,
+            "nombre": nombre,
+            "id_rol": rol
+        }
+
+    # Datos para renovar la sesión de un usuario activo (None si ya no lo está)
+    def get_session_user(self, user_id: int):
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                prepared_statements.execute(cursor, SESSION_QUERY, (user_id,))
+                result = cursor.fetchone()
         except psycopg2.Error as err:
             raise HTTPException(status_code=500, detail=f"Error de base de datos: {str(err)}")
-        finally:
-            if conn: conn.close()
+        
+        if not result:
+            return None
+        return {"id": result[0], "email": result[1], "id_rol": result[2]}
+
+    def update_password_hash(self, user_id: int, password_hash: str):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE usuarios SET password_hash = %s, fecha_actualizacion = NOW() WHERE id_usuario = %s",
+                (password_hash, user_id)
+            )
+            conn.commit()
+
+    # Autenticar usuario por email y contraseña
+    # La consulta usa una conexión del pool solo durante el SELECT; bcrypt se
+    # ejecuta después en el pool de contraseñas, sin retener la conexión
+    async def authenticate_user(self, email: str, password: str):
+        user = await run_db(self.get_login_user, email)
+        
+        valid, new_hash = await password_pool.verify(password, user["password_hash"] if user else None)
+        if not user or not valid:
+            raise HTTPException(status_code=401, detail="Credenciales inválidas")
+        
+        # Rehash transparente (coste de bcrypt desactualizado o contraseña heredada en texto plano)
+        if new_hash:
+            try:
+                await run_db(self.update_password_hash, user["id"], new_hash)
+            except psycopg2.Error as err:
+                print(f"No se pudo actualizar el hash de la contraseña del usuario {user['id']}: {err}")
+        
+        return {
+            "id": user["id"],
+            "email": user["email"],
+            "nombre": user["nombre"],
+            "id_rol": user["id_rol"]
+        }
@@ -9,17 +9,58 @@ from .routes.perfiles_clinicos_routes import router as perfiles_clinicos_router
 from .routes.alimentos_routes import router as alimentos_router
 from .routes.permisos_roles_routes import router as permisos_roles_router
 from .routes.registro_consumo_routes import router as registro_consumo_router
+from .routes.resumen_consumo_routes import router as resumen_consumo_router
 from .routes.historial_routes import router as historial_router
 from .routes.historial_chat_routes import router as historial_chat_router
 from .routes.ai_routes import router as ai_router
 
-from .utils.auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, SimpleTokenResponse
+from .utils.auth import create_access_token, create_refresh_token, SimpleTokenResponse, RefreshRequest
+from .utils.auth import decode_payload, revoke_token, get_token_from_header
 from .controllers.user_controller import UserController
-from .utils.auth import LoginRequest
-from datetime import timedelta
+from .utils.auth import LoginRequest, verify_token
+from .config.db_config import get_pool_stats, close_db_pool, run_db
+from .config.schema_registry import schema_registry
+from .config.prepared_statements import prepared_statements
+from .utils.inference_pool import inference_pool
+from .utils.model_manager import model_manager
+from .utils.password_pool import password_pool
+from .utils.login_throttle import login_throttle, client_ip
+from .utils.token_revocation import token_revocations
+from .utils.http_client import http_client
+from .utils.catalog_cache import catalog_cache
+from .utils.metrics import metrics, MetricsMiddleware, METRICS_ENABLED
+from .utils.slow_queries import slow_query_log
+from fastapi import Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+import psycopg2
+from contextlib import asynccontextmanager
+
+# Ciclo de vida de la aplicación
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cargar y calentar el modelo de IA en segundo plano
+    model_manager.start()
+    # Cliente HTTP compartido para llamadas a otros servicios
+    await http_client.start()
+    # Cargar los metadatos de las tablas una sola vez
+    try:
+        await run_db(schema_registry.load)
+    except psycopg2.Error as e:
+        print(f"No se pudo cargar el registro de esquema al iniciar: {e}. Se cargará en el primer uso.")
+    # Cargar la lista de tokens revocados vigentes
+    try:
+        await run_db(token_revocations.load)
+    except psycopg2.Error as e:
+        print(f"No se pudo cargar la lista de tokens revocados: {e}")
+    yield
+    # Cerrar las conexiones del pool y los hilos de inferencia y de contraseñas al apagar el servidor
+    close_db_pool()
+    inference_pool.shutdown()
+    password_pool.shutdown()
+    await http_client.close()
 
 # Configuración de la API
-app = FastAPI(title="NutriScan API")
+app = FastAPI(title="NutriScan API", lifespan=lifespan)
 
 # Configuración de CORS
 origins = [
@@ -37,6 +78,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia y conteo de peticiones por ruta para /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Integración de todas las Rutas CRUD de la BD
 app.include_router(user_router)
 app.include_router(roles_router)
@@ -46,6 +91,7 @@ app.include_router(perfiles_clinicos_router)
 app.include_router(alimentos_router)
 app.include_router(permisos_roles_router)
 app.include_router(registro_consumo_router)
+app.include_router(resumen_consumo_router)
 app.include_router(historial_router)
 app.include_router(historial_chat_router)
 app.include_router(ai_router)
@@ -60,21 +106,106 @@ def home():
         "docs": "/docs"
     }
 
+# Estado del pool de conexiones a la base de datos
+@app.get("/health/db")
+def db_health():
+    return {
+        "pool": get_pool_stats(),
+        "sentencias_preparadas": prepared_statements.stats(),
+        "cache_catalogos": catalog_cache.stats()
+    }
+
+# Estado del pool y de la cola de inferencia, leídos al exportar
+def _pool_connections():
+    stats = get_pool_stats()
+    return {("en_uso",): stats["en_uso"], ("disponibles",): stats["disponibles"]}
+
+metrics.gauge("db_pool_connections", "Conexiones del pool por estado", _pool_connections, ("state",))
+metrics.gauge("db_pool_timeouts", "Esperas de conexión que agotaron el timeout", lambda: get_pool_stats()["timeouts"])
+metrics.gauge("ai_inference_pending", "Análisis de imágenes en curso o en espera", lambda: inference_pool.stats()["pendientes"])
+
+# Métricas en formato de texto de Prometheus
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Últimas consultas lentas (y sus EXPLAIN) registradas por este proceso
+@app.get("/health/slow-queries", dependencies=[Depends(verify_token)])
+def slow_queries(limit: int = Query(50, ge=1, le=100)):
+    return {"configuracion": slow_query_log.stats(), "consultas": slow_query_log.recent(limit)}
+
+# Recargar los metadatos de las tablas (tras migraciones)
+@app.post("/schema/refresh", dependencies=[Depends(verify_token)])
+async def refresh_schema():
+    tables = await run_db(schema_registry.refresh)
+    catalog_cache.clear()
+    return {"resultado": "Registro de esquema actualizado", "tablas": sorted(tables)}
+
 # Endpoint de login
 @app.post("/login", response_model=SimpleTokenResponse)
-def login(credentials: LoginRequest):
-    user = user_controller.authenticate_user(credentials.email, credentials.password)
+async def login(credentials: LoginRequest, request: Request):
+    ip = client_ip(request)
+    # Frenar fuerza bruta por cuenta y por IP antes de gastar CPU en bcrypt
+    login_throttle.check(credentials.email, ip)
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user["id"]), "email": user["email"]},
-        expires_delta=access_token_expires
-    )
+    try:
+        user = await user_controller.authenticate_user(credentials.email, credentials.password)
+    except HTTPException as e:
+        if e.status_code == 401:
+            login_throttle.record_failure(credentials.email, ip)
+        raise
+    login_throttle.record_success(credentials.email)
     
+    return issue_tokens(user)
+
+# Par de tokens de una sesión: acceso (corto) y refresco (largo)
+def issue_tokens(user: dict) -> dict:
+    # El rol permite comprobar permisos sin consultar la BD (ver utils/permissions.py)
+    claims = {"sub": str(user["id"]), "email": user["email"], "rol": user["id_rol"]}
     return {
-        "access": access_token
+        "access": create_access_token(claims),
+        "refresh": create_refresh_token(claims)
     }
 
+# Valida el token de refresco, comprueba que el usuario siga activo y lo revoca (rotación)
+def rotate_refresh_token(refresh_token: str) -> dict:
+    payload = decode_payload(refresh_token, "refresh")
+    user = user_controller.get_session_user(int(payload["sub"]))
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuario inactivo")
+    # Un token de refresco solo se usa una vez
+    if not revoke_token(refresh_token, payload):
+        raise HTTPException(status_code=401, detail="Token revocado")
+    return user
+
+# Renovar la sesión sin credenciales (ni bcrypt)
+@app.post("/token/refresh", response_model=SimpleTokenResponse)
+async def refresh_token(body: RefreshRequest):
+    try:
+        user = await run_db(rotate_refresh_token, body.refresh)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=503, detail=f"No se pudo validar el token de refresco: {str(e)}")
+    return issue_tokens(user)
+
+# Revoca el token de refresco y, si se envía, el de acceso actual
+def end_session(refresh_token: str, access_token: str = None):
+    revoke_token(refresh_token, decode_payload(refresh_token, "refresh"))
+    if access_token:
+        try:
+            revoke_token(access_token, decode_payload(access_token))
+        except HTTPException:
+            pass
+
+@app.post("/logout")
+async def logout(body: RefreshRequest, request: Request):
+    auth_header = request.headers.get("Authorization")
+    access_token = get_token_from_header(auth_header) if auth_header else None
+    try:
+        await run_db(end_session, body.refresh, access_token)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=503, detail=f"No se pudo cerrar la sesión: {str(e)}")
+    return {"resultado": "Sesión cerrada"}
+
 # Configuración de Swagger
 def custom_openapi():
     if app.openapi_schema:
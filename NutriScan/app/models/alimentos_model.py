@@ -1,9 +1,16 @@
 
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class AlimentosCreate(BaseModel):
     data: Dict[str, Any]
 
 class AlimentosUpdate(BaseModel):
     data: Dict[str, Any]
+
+class AlimentosBulk(BaseModel):
+    rows: List[Dict[str, Any]]
+    # Columnas con restricción única para hacer upsert (ON CONFLICT ... DO UPDATE)
+    conflict_columns: Optional[List[str]] = None
+    # Si alguna fila falla no se guarda ninguna
+    all_or_nothing: bool = False
@@ -1,9 +1,16 @@
 
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class Historial_chatCreate(BaseModel):
     data: Dict[str, Any]
 
 class Historial_chatUpdate(BaseModel):
     data: Dict[str, Any]
+
+class Historial_chatBulk(BaseModel):
+    rows: List[Dict[str, Any]]
+    # Columnas con restricción única para hacer upsert (ON CONFLICT ... DO UPDATE)
+    conflict_columns: Optional[List[str]] = None
+    # Si alguna fila falla no se guarda ninguna
+    all_or_nothing: bool = False
@@ -1,12 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse
 from app.controllers.ai_controller import AIController
+from app.utils.inference_pool import inference_pool
+from app.utils.model_manager import model_manager
+from app.utils.result_cache import result_cache
+from app.utils.auth import verify_token
 
 router = APIRouter(prefix="/ai", tags=["AI Analysis"])
 
 # Instanciar el controlador de IA
-# El modelo YOLOv8n se cargará una vez al arrancar (o al primer uso)
+# El modelo YOLOv8n lo carga el ModelManager al arrancar la API
 ai_controller = AIController()
 
+@router.get("/ready")
+async def model_ready():
+    """
+    Disponibilidad del modelo: 200 solo cuando está cargado y caliente.
+    """
+    status = model_manager.status()
+    return JSONResponse(status_code=200 if model_manager.is_ready() else 503, content=status)
+
 @router.post("/biotype/{user_id}")
 async def analyze_biotype(user_id: int, file: UploadFile = File(...)):
     """
@@ -27,3 +40,24 @@ async def analyze_food(user_id: int, file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="El archivo no es una imagen válida")
         
     return await ai_controller.analyze_food(user_id, file)
+
+@router.get("/stats")
+async def inference_stats():
+    """
+    Estadísticas del pool de inferencia, del agrupador de lotes (micro-batching)
+    y de la caché de resultados.
+    """
+    batcher = ai_controller.yolo.batcher
+    return {
+        "pool": inference_pool.stats(),
+        "batching": batcher.stats() if batcher else None,
+        "cache": result_cache.stats()
+    }
+
+@router.delete("/cache", dependencies=[Depends(verify_token)])
+async def clear_cache():
+    """
+    Invalida la caché de resultados (p. ej. tras cambiar umbrales de detección).
+    """
+    result_cache.clear()
+    return {"resultado": "Caché de resultados de IA vaciada"}
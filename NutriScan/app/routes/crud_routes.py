@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.config.db_config import run_db
+from app.utils.auth import verify_token, TokenData
+from app.utils.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from app.utils.export import EXPORT_MEDIA_TYPES, stream_export
+from app.utils.catalog_cache import catalog_cache, catalog_response
+from app.utils.permissions import require_permission, TABLE_MODULES, ESCRIBIR, EDITAR
+
+
+# Construye el router CRUD de una tabla sobre su CrudController.
+# Los modelos de cada tabla se pasan para que la documentación muestre sus nombres.
+def build_crud_router(table: str, controller, create_model, update_model, bulk_model) -> APIRouter:
+    router = APIRouter(
+        prefix=f"/{table}",
+        tags=[table],
+        # Todas las rutas requieren un token válido
+        dependencies=[Depends(verify_token)]
+    )
+    cached = catalog_cache.is_cached(table)
+
+    # Las escrituras de las tablas asociadas a un módulo exigen su permiso;
+    # la lectura queda abierta a cualquier usuario autenticado
+    module = TABLE_MODULES.get(table)
+    can_write = [Depends(require_permission(module, ESCRIBIR))] if module else []
+    can_edit = [Depends(require_permission(module, EDITAR))] if module else []
+    # Con conflict_columns el alta masiva actualiza filas existentes (upsert)
+    can_upsert = require_permission(module, ESCRIBIR | EDITAR) if module else None
+
+    # Lectura de una tabla de catálogo: desde la caché, con ETag y 304
+    async def read_cached(request: Request, key: tuple, func, *args):
+        entry = catalog_cache.get(table, key)
+        if entry is None:
+            version = catalog_cache.version(table)
+            entry = catalog_cache.store(table, key, version, await run_db(func, *args))
+        return catalog_response(request, entry)
+
+    @router.get("/")
+    async def get_all(
+        request: Request,
+        after_id: Optional[int] = None,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        fields: Optional[str] = None
+    ):
+        if cached:
+            return await read_cached(request, ("get_all", after_id, limit, fields), controller.get_all, after_id, limit, fields)
+        return await run_db(controller.get_all, after_id, limit, fields)
+
+    # Debe declararse antes de /{item_id} para que no se interprete como id
+    @router.get("/export")
+    async def export(format: str = "ndjson"):
+        rows = await run_db(controller.export, format)
+        return StreamingResponse(
+            stream_export(rows),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+        )
+
+    @router.get("/{item_id}")
+    async def get_by_id(request: Request, item_id: int):
+        if cached:
+            return await read_cached(request, ("get_by_id", item_id), controller.get_by_id, item_id)
+        return await run_db(controller.get_by_id, item_id)
+
+    @router.post("/", dependencies=can_write)
+    async def create(data: create_model):
+        return await run_db(controller.create, data.data)
+
+    # Alta masiva en una sola transacción, con error por fila.
+    # Si es un upsert exige además el permiso de edición, como PUT
+    @router.post("/bulk", dependencies=can_write)
+    async def bulk_create(request: Request, data: bulk_model, token_data: TokenData = Depends(verify_token)):
+        if data.conflict_columns and can_upsert is not None:
+            await can_upsert(request, token_data)
+        return await run_db(controller.bulk_create, data.rows, data.conflict_columns, data.all_or_nothing)
+
+    @router.put("/{item_id}", dependencies=can_edit)
+    async def update(item_id: int, data: update_model):
+        return await run_db(controller.update, item_id, data.data)
+
+    @router.delete("/{item_id}", dependencies=can_edit) # Se mantiene el método HTTP DELETE para la API, pero llama a deactivate
+    async def deactivate(item_id: int):
+        return await run_db(controller.deactivate, item_id)
+
+    return router
@@ -1,37 +1,8 @@
 
-from fastapi import APIRouter, Request, HTTPException
 from app.controllers.perfiles_clinicos_controller import Perfiles_clinicosController
-from app.models.perfiles_clinicos_model import Perfiles_clinicosCreate, Perfiles_clinicosUpdate
-from app.utils.auth import verify_token
-
-router = APIRouter(
-    prefix="/perfiles_clinicos",
-    tags=["perfiles_clinicos"]
-)
+from app.models.perfiles_clinicos_model import Perfiles_clinicosCreate, Perfiles_clinicosUpdate, Perfiles_clinicosBulk
+from app.routes.crud_routes import build_crud_router
 
 controller = Perfiles_clinicosController()
 
-@router.get("/")
-async def get_all(request: Request):
-    await verify_token(request)
-    return controller.get_all()
-
-@router.get("/{item_id}")
-async def get_by_id(item_id: int, request: Request):
-    await verify_token(request)
-    return controller.get_by_id(item_id)
-
-@router.post("/")
-async def create(data: Perfiles_clinicosCreate, request: Request):
-    await verify_token(request)
-    return controller.create(data.data)
-
-@router.put("/{item_id}")
-async def update(item_id: int, data: Perfiles_clinicosUpdate, request: Request):
-    await verify_token(request)
-    return controller.update(item_id, data.data)
-
-@router.delete("/{item_id}") # Se mantiene el método HTTP DELETE para la API, pero llama a deactivate
-async def deactivate(item_id: int, request: Request):
-    await verify_token(request)
-    return controller.deactivate(item_id)
+router = build_crud_router("perfiles_clinicos", controller, Perfiles_clinicosCreate, Perfiles_clinicosUpdate, Perfiles_clinicosBulk)
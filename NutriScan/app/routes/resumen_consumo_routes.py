@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Optional
+from app.controllers.resumen_consumo_controller import ResumenConsumoController
+from app.config.db_config import run_db
+from app.utils.auth import verify_token
+from app.utils.permissions import require_permission, LEER, EDITAR
+
+router = APIRouter(
+    prefix="/resumen_consumo",
+    tags=["resumen_consumo"],
+    dependencies=[Depends(verify_token)]
+)
+
+controller = ResumenConsumoController()
+
+# Los totales de un usuario los ve él mismo o quien pueda leer usuarios
+can_read_user = [Depends(require_permission("Usuarios", LEER, owner_param="id_usuario"))]
+
+# Recalcular el resumen (todo, o un usuario y/o rango de fechas).
+# Borra y recalcula filas de todos los usuarios: solo quien puede editar usuarios.
+@router.post("/rebuild", dependencies=[Depends(require_permission("Usuarios", EDITAR))])
+async def rebuild(id_usuario: Optional[int] = None, desde: Optional[date] = None, hasta: Optional[date] = None):
+    return await run_db(controller.rebuild, id_usuario, desde, hasta)
+
+# Totales por día en un rango de fechas
+@router.get("/{id_usuario}", dependencies=can_read_user)
+async def get_range(id_usuario: int, desde: date, hasta: date):
+    return await run_db(controller.get_range, id_usuario, desde, hasta)
+
+# Totales del día, la semana (lunes a domingo) o el mes que contiene la fecha (hoy por defecto)
+@router.get("/{id_usuario}/{periodo}", dependencies=can_read_user)
+async def get_period(id_usuario: int, periodo: str, fecha: Optional[date] = None):
+    return await run_db(controller.get_period, id_usuario, periodo, fecha)
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException, Request
-import requests
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app.controllers.user_controller import UserController
 from app.models.user_model import User, BiotypeUpdate
 from app.utils.auth import verify_token, TokenData
-from typing import List
-import os
+from app.config.db_config import run_db
+from app.utils.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from app.utils.locations_cache import locations_cache, LOCATIONS_TTL
+from app.utils.http_cache import etag_matches
+from app.utils.permissions import require_permission, ensure_permissions, permission_matrix, LEER, ESCRIBIR, EDITAR
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/users",
@@ -13,60 +16,65 @@ router = APIRouter(
 
 user_controller = UserController()
 
-# URL del servicio de ubicaciones
-NODE_SERVICE_URL = os.getenv("NODE_SERVICE_URL", "https://proyecto-rc-jju7.vercel.app/api/ubicaciones") 
+# Respuesta de ubicaciones desde la caché, con ETag y 304 si el cliente ya la tiene
+def _locations_response(request: Request, snapshot, view: str) -> Response:
+    etag = snapshot.etags[view]
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(LOCATIONS_TTL)}"}
+    
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=snapshot.body(view), media_type="application/json", headers=headers)
 
-# Proxy para obtener ciudades
+# Ciudades del servicio de ubicaciones (formato {total, data})
 @router.get("/locations")
-def get_external_locations():
-    try:
-        response = requests.get(NODE_SERVICE_URL, timeout=10)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(
-                status_code=response.status_code, 
-                detail="El servicio de ubicaciones devolvió un error."
-            )
-            
-    except requests.exceptions.Timeout:
-        raise HTTPException(status_code=504, detail="Tiempo de espera agotado.")
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(status_code=502, detail="Error de conexión.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+async def get_external_locations(request: Request):
+    return _locations_response(request, await locations_cache.get(), "flat")
+
+# Ciudades agrupadas por país y departamento
+@router.get("/locations/tree")
+async def get_locations_tree(request: Request):
+    return _locations_response(request, await locations_cache.get(), "tree")
+
+
+# Permisos del usuario autenticado por módulo (para mostrar u ocultar opciones)
+@router.get("/me/permissions")
+async def get_my_permissions(current_user: TokenData = Depends(verify_token)):
+    if current_user.id_rol is None:
+        raise HTTPException(status_code=401, detail="Token sin rol, renueve la sesión")
+    await ensure_permissions()
+    return {"id_rol": current_user.id_rol, "permisos": permission_matrix.describe(current_user.id_rol)}
 
 
 # Rutas CRUD de usuarios
 
 # Crear usuario
 @router.post("/", response_model=dict)
-async def create_user(user: User, request: Request):
-    current_user = await verify_token(request)
-    return user_controller.create_user(user)
+async def create_user(user: User, current_user: TokenData = Depends(require_permission("Usuarios", ESCRIBIR))):
+    return await run_db(user_controller.create_user, user)
 
 # Obtener usuarios activos
 @router.get("/", response_model=dict)
-async def get_active_users(request: Request):
-    current_user = await verify_token(request)
-    return user_controller.get_active_users()
+async def get_active_users(
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = None,
+    current_user: TokenData = Depends(require_permission("Usuarios", LEER))
+):
+    return await run_db(user_controller.get_active_users, after_id, limit, fields)
 
 # Actualizar usuario
 @router.put("/{user_id}", response_model=dict)
-async def update_user(user_id: int, user: User, request: Request):
-    current_user = await verify_token(request)
+async def update_user(user_id: int, user: User, current_user: TokenData = Depends(require_permission("Usuarios", EDITAR))):
     user.id = user_id
-    return user_controller.update_user(user)
+    return await run_db(user_controller.update_user, user)
 
 # Desactivar usuario
 @router.delete("/{user_id}", response_model=dict)
-async def deactivate(user_id: int, request: Request):
-    current_user = await verify_token(request)
-    return user_controller.deactivate(user_id)
+async def deactivate(user_id: int, current_user: TokenData = Depends(require_permission("Usuarios", EDITAR))):
+    return await run_db(user_controller.deactivate, user_id)
 
-# Actualizar biotipo
+# Actualizar biotipo (el propio usuario o quien pueda editar usuarios)
 @router.put("/{user_id}/biotype")
-async def update_biotype(user_id: int, data: BiotypeUpdate, request: Request): 
-    current_user = await verify_token(request)
-    return user_controller.update_biotype(user_id, data.biotipo, data.confianza_ia)
+async def update_biotype(user_id: int, data: BiotypeUpdate, current_user: TokenData = Depends(require_permission("Usuarios", EDITAR, owner_param="user_id"))): 
+    return await run_db(user_controller.update_biotype, user_id, data.biotipo, data.confianza_ia)
@@ -0,0 +1,178 @@
+-- =============================================================
+-- RESUMEN DIARIO DE CONSUMO (totales por usuario y día)
+-- =============================================================
+-- Los triggers de registro_consumo mantienen los totales al insertar,
+-- modificar o desactivar registros; solo cuentan los registros 'Activo'.
+-- Los nutrientes de alimentos son por 100 g (los vacíos cuentan como 0).
+-- Los triggers son por sentencia y usan tablas de transición, así una alta
+-- masiva actualiza cada día afectado una sola vez.
+-- Ejecutar este archivo también reconstruye el resumen con los datos existentes.
+CREATE TABLE IF NOT EXISTS resumen_consumo_diario (
+    id_usuario INT NOT NULL REFERENCES usuarios(id_usuario),
+    fecha DATE NOT NULL,
+    calorias NUMERIC NOT NULL DEFAULT 0,
+    proteinas_g NUMERIC NOT NULL DEFAULT 0,
+    carbohidratos_g NUMERIC NOT NULL DEFAULT 0,
+    grasas_g NUMERIC NOT NULL DEFAULT 0,
+    registros INT NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_usuario, fecha)
+);
+
+-- Suma (signo 1) o resta (signo -1) los registros recibidos en los totales del día
+CREATE OR REPLACE FUNCTION aplicar_cambios_consumo(cambios JSONB)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resumen_consumo_diario AS r
+        (id_usuario, fecha, calorias, proteinas_g, carbohidratos_g, grasas_g, registros)
+    SELECT c.id_usuario, c.fecha_consumo,
+           SUM(c.signo * COALESCE(a.calorias, 0) * c.cantidad_gramos / 100),
+           SUM(c.signo * COALESCE(a.proteinas_g, 0) * c.cantidad_gramos / 100),
+           SUM(c.signo * COALESCE(a.carbohidratos_g, 0) * c.cantidad_gramos / 100),
+           SUM(c.signo * COALESCE(a.grasas_g, 0) * c.cantidad_gramos / 100),
+           SUM(c.signo)
+    FROM jsonb_to_recordset(cambios)
+        AS c(id_usuario INT, id_alimento INT, cantidad_gramos NUMERIC, fecha_consumo DATE, signo INT)
+    JOIN alimentos a ON a.id_alimento = c.id_alimento
+    WHERE c.fecha_consumo IS NOT NULL
+    GROUP BY c.id_usuario, c.fecha_consumo
+    -- Orden fijo para que transacciones concurrentes bloqueen los días en el mismo orden
+    ORDER BY c.id_usuario, c.fecha_consumo
+    ON CONFLICT (id_usuario, fecha) DO UPDATE SET
+        calorias = r.calorias + EXCLUDED.calorias,
+        proteinas_g = r.proteinas_g + EXCLUDED.proteinas_g,
+        carbohidratos_g = r.carbohidratos_g + EXCLUDED.carbohidratos_g,
+        grasas_g = r.grasas_g + EXCLUDED.grasas_g,
+        registros = r.registros + EXCLUDED.registros,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+
+    -- Días sin registros activos
+    DELETE FROM resumen_consumo_diario
+    WHERE registros <= 0
+      AND (id_usuario, fecha) IN (
+          SELECT (e->>'id_usuario')::INT, (e->>'fecha_consumo')::DATE FROM jsonb_array_elements(cambios) e
+      );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION acumular_resumen_consumo()
+RETURNS TRIGGER AS $$
+DECLARE
+    cambios JSONB;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT jsonb_agg(jsonb_build_object('id_usuario', id_usuario, 'id_alimento', id_alimento,
+                         'cantidad_gramos', cantidad_gramos, 'fecha_consumo', fecha_consumo, 'signo', 1))
+        INTO cambios FROM nuevos WHERE estado = 'Activo';
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Solo las filas cuyo aporte cambió: se resta la versión anterior y se suma la nueva
+        SELECT jsonb_agg(c) INTO cambios FROM (
+            SELECT jsonb_build_object('id_usuario', o.id_usuario, 'id_alimento', o.id_alimento,
+                   'cantidad_gramos', o.cantidad_gramos, 'fecha_consumo', o.fecha_consumo, 'signo', -1) AS c
+            FROM anteriores o JOIN nuevos n ON n.id_registro = o.id_registro
+            WHERE o.estado = 'Activo'
+              AND (o.id_usuario, o.id_alimento, o.cantidad_gramos, o.fecha_consumo, o.estado)
+                  IS DISTINCT FROM (n.id_usuario, n.id_alimento, n.cantidad_gramos, n.fecha_consumo, n.estado)
+            UNION ALL
+            SELECT jsonb_build_object('id_usuario', n.id_usuario, 'id_alimento', n.id_alimento,
+                   'cantidad_gramos', n.cantidad_gramos, 'fecha_consumo', n.fecha_consumo, 'signo', 1)
+            FROM anteriores o JOIN nuevos n ON n.id_registro = o.id_registro
+            WHERE n.estado = 'Activo'
+              AND (o.id_usuario, o.id_alimento, o.cantidad_gramos, o.fecha_consumo, o.estado)
+                  IS DISTINCT FROM (n.id_usuario, n.id_alimento, n.cantidad_gramos, n.fecha_consumo, n.estado)
+        ) t;
+    ELSE
+        SELECT jsonb_agg(jsonb_build_object('id_usuario', id_usuario, 'id_alimento', id_alimento,
+                         'cantidad_gramos', cantidad_gramos, 'fecha_consumo', fecha_consumo, 'signo', -1))
+        INTO cambios FROM anteriores WHERE estado = 'Activo';
+    END IF;
+
+    IF cambios IS NOT NULL THEN
+        PERFORM aplicar_cambios_consumo(cambios);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_resumen_consumo_insert ON registro_consumo;
+DROP TRIGGER IF EXISTS trigger_resumen_consumo_update ON registro_consumo;
+DROP TRIGGER IF EXISTS trigger_resumen_consumo_delete ON registro_consumo;
+CREATE TRIGGER trigger_resumen_consumo_insert AFTER INSERT ON registro_consumo
+    REFERENCING NEW TABLE AS nuevos FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_consumo();
+CREATE TRIGGER trigger_resumen_consumo_update AFTER UPDATE ON registro_consumo
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS nuevos FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_consumo();
+CREATE TRIGGER trigger_resumen_consumo_delete AFTER DELETE ON registro_consumo
+    REFERENCING OLD TABLE AS anteriores FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_consumo();
+
+-- Recalcula desde cero los días de un usuario (o de todos) en un rango de fechas.
+-- Devuelve el número de días con registros. Se usa para backfills y reparaciones.
+CREATE OR REPLACE FUNCTION recalcular_resumen_consumo(
+    p_usuario INT DEFAULT NULL, p_desde DATE DEFAULT NULL, p_hasta DATE DEFAULT NULL
+)
+RETURNS INT AS $$
+DECLARE
+    dias INT;
+BEGIN
+    -- Bloquea las escrituras de los triggers mientras se recalcula: las que ya
+    -- estaban en curso terminan antes y se leen sus registros confirmados
+    LOCK TABLE resumen_consumo_diario IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM resumen_consumo_diario
+    WHERE (p_usuario IS NULL OR id_usuario = p_usuario)
+      AND (p_desde IS NULL OR fecha >= p_desde)
+      AND (p_hasta IS NULL OR fecha <= p_hasta);
+
+    INSERT INTO resumen_consumo_diario
+        (id_usuario, fecha, calorias, proteinas_g, carbohidratos_g, grasas_g, registros)
+    SELECT rc.id_usuario, rc.fecha_consumo,
+           SUM(COALESCE(a.calorias, 0) * rc.cantidad_gramos / 100),
+           SUM(COALESCE(a.proteinas_g, 0) * rc.cantidad_gramos / 100),
+           SUM(COALESCE(a.carbohidratos_g, 0) * rc.cantidad_gramos / 100),
+           SUM(COALESCE(a.grasas_g, 0) * rc.cantidad_gramos / 100),
+           COUNT(*)
+    FROM registro_consumo rc
+    JOIN alimentos a ON a.id_alimento = rc.id_alimento
+    WHERE rc.estado = 'Activo' AND rc.fecha_consumo IS NOT NULL
+      AND (p_usuario IS NULL OR rc.id_usuario = p_usuario)
+      AND (p_desde IS NULL OR rc.fecha_consumo >= p_desde)
+      AND (p_hasta IS NULL OR rc.fecha_consumo <= p_hasta)
+    GROUP BY rc.id_usuario, rc.fecha_consumo
+    ON CONFLICT (id_usuario, fecha) DO UPDATE SET
+        calorias = EXCLUDED.calorias,
+        proteinas_g = EXCLUDED.proteinas_g,
+        carbohidratos_g = EXCLUDED.carbohidratos_g,
+        grasas_g = EXCLUDED.grasas_g,
+        registros = EXCLUDED.registros,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+
+    GET DIAGNOSTICS dias = ROW_COUNT;
+    RETURN dias;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Si cambian los nutrientes de un alimento se recalculan los días que lo incluyen
+CREATE OR REPLACE FUNCTION recalcular_resumen_por_alimento()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM recalcular_resumen_consumo(d.id_usuario, d.fecha_consumo, d.fecha_consumo)
+    FROM (
+        SELECT DISTINCT rc.id_usuario, rc.fecha_consumo
+        FROM anteriores o
+        JOIN nuevos n ON n.id_alimento = o.id_alimento
+        JOIN registro_consumo rc ON rc.id_alimento = n.id_alimento
+        WHERE (o.calorias, o.proteinas_g, o.carbohidratos_g, o.grasas_g)
+              IS DISTINCT FROM (n.calorias, n.proteinas_g, n.carbohidratos_g, n.grasas_g)
+          AND rc.estado = 'Activo'
+        ORDER BY rc.id_usuario, rc.fecha_consumo
+    ) d;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_resumen_consumo_alimentos ON alimentos;
+CREATE TRIGGER trigger_resumen_consumo_alimentos AFTER UPDATE ON alimentos
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS nuevos FOR EACH STATEMENT EXECUTE FUNCTION recalcular_resumen_por_alimento();
+
+CREATE INDEX IF NOT EXISTS idx_registro_consumo_usuario_fecha ON registro_consumo(id_usuario, fecha_consumo);
+
+SELECT recalcular_resumen_consumo();
@@ -0,0 +1,13 @@
+-- =============================================================
+-- TOKENS REVOCADOS (logout y rotación de tokens de refresco)
+-- =============================================================
+-- Solo se guarda el identificador (jti) de cada token y su fecha de expiración
+-- en UTC; la API purga las filas caducadas al arrancar.
+CREATE TABLE IF NOT EXISTS tokens_revocados (
+    jti VARCHAR(64) PRIMARY KEY,
+    id_usuario INT NOT NULL REFERENCES usuarios(id_usuario),
+    expira TIMESTAMP NOT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_tokens_revocados_expira ON tokens_revocados(expira);
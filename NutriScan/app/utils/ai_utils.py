@@ -1,73 +1,250 @@
 import cv2
 import numpy as np
-import onnxruntime as ort
 import os
-import urllib.request
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from app.utils.model_manager import ModelManager, model_manager
+from app.utils.metrics import ai_stage_duration
+
+# Parámetros de post-proceso de YOLOv8
+AI_CONF_THRESHOLD = float(os.getenv("AI_CONF_THRESHOLD", "0.25"))
+AI_IOU_THRESHOLD = float(os.getenv("AI_IOU_THRESHOLD", "0.45"))
+AI_MAX_CANDIDATES = 300
+AI_INPUT_SIZE = 640
+
+# Clases de COCO (índice base 0 de YOLOv8)
+PERSON_CLASS = 0
+FOOD_LABELS = {
+    46: "banana", 47: "apple", 48: "sandwich", 49: "orange", 50: "broccoli",
+    51: "carrot", 52: "hot dog", 53: "pizza", 54: "donut", 55: "cake"
+}
+
+
+# Supresión de no máximos. Las cajas se desplazan por clase para que solo
+# compitan entre sí las de la misma clase; el IoU se calcula vectorizado
+# contra todas las candidatas restantes en cada paso.
+def nms(boxes, scores, classes, iou_threshold=AI_IOU_THRESHOLD):
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offset = classes[:, None].astype(np.float32) * (boxes.max() + 1)
+    shifted = boxes + offset
+    x1, y1, x2, y2 = shifted[:, 0], shifted[:, 1], shifted[:, 2], shifted[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+# Decodifica la salida 1x84x8400 de YOLOv8 (cx, cy, w, h + 80 puntajes de clase).
+# meta es el diccionario que devuelve letterbox (tamaño original, escala y relleno).
+# Devuelve cajas x1,y1,x2,y2 en coordenadas de la imagen original, puntajes y clases.
+def decode_yolov8(output, meta, class_ids=None, conf_threshold=AI_CONF_THRESHOLD, iou_threshold=AI_IOU_THRESHOLD):
+    preds = output[0].T  # (8400, 84)
+    scores = preds[:, 4:]
+
+    if class_ids is not None:
+        class_ids = np.asarray(sorted(class_ids))
+        scores = scores[:, class_ids]
+
+    best = scores.argmax(axis=1)
+    conf = scores[np.arange(len(scores)), best]
+    mask = conf > conf_threshold
+    if not mask.any():
+        return np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.int64)
+
+    preds, conf, best = preds[mask], conf[mask], best[mask]
+    classes = class_ids[best] if class_ids is not None else best
+
+    # Limitar candidatas antes de NMS
+    if len(conf) > AI_MAX_CANDIDATES:
+        top = np.argpartition(conf, -AI_MAX_CANDIDATES)[-AI_MAX_CANDIDATES:]
+        preds, conf, classes = preds[top], conf[top], classes[top]
+
+    # Centro/tamaño -> esquinas, sin relleno y reescalado al tamaño original
+    height, width = meta["shape"]
+    pad_x, pad_y = meta["pad"]
+    cx, cy, w, h = preds[:, 0] - pad_x, preds[:, 1] - pad_y, preds[:, 2], preds[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1) / meta["scale"]
+    np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+    np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+
+    keep = nms(boxes, conf, classes, iou_threshold)
+    return boxes[keep], conf[keep], classes[keep]
+
+
+# Color de relleno del letterbox (mismo valor que usa Ultralytics)
+LETTERBOX_COLOR = 114
+_INV_255 = np.float32(1.0 / 255.0)
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+# Buffers de entrada reutilizados por cada hilo de inferencia
+class _InputBuffers(threading.local):
+
+    def __init__(self):
+        self.canvas = np.full((AI_INPUT_SIZE, AI_INPUT_SIZE, 3), LETTERBOX_COLOR, dtype=np.uint8)
+        self.tensor = np.empty((1, 3, AI_INPUT_SIZE, AI_INPUT_SIZE), dtype=np.float32)
+
+
+_buffers = _InputBuffers()
+
+
+# Lee alto y ancho del encabezado SOF de un JPEG sin decodificarlo
+def jpeg_size(data: bytes):
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        length = int.from_bytes(data[i + 2:i + 4], "big")
+        # SOF0..SOF15 excepto DHT (C4), JPG (C8) y DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return height, width
+        i += 2 + length
+    return None
+
+
+# Decodifica la imagen; los JPEG mucho mayores que la entrada del modelo se
+# decodifican directamente a 1/2, 1/4 u 1/8 de escala (IMREAD_REDUCED_*).
+# Devuelve la imagen y el factor de reducción aplicado.
+def decode_image(image_bytes: bytes):
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    size = jpeg_size(image_bytes)
+    if size:
+        longest = max(size)
+        for factor, flag in _REDUCED_FLAGS:
+            if longest // factor >= AI_INPUT_SIZE:
+                return cv2.imdecode(nparr, flag), factor
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR), 1
+
+
+# Redimensiona conservando la proporción y rellena hasta 640x640 dentro del
+# buffer del hilo. La conversión BGR->RGB, HWC->CHW y la normalización a [0, 1]
+# se hacen en una sola pasada escribiendo en el tensor preasignado.
+# Devuelve el tensor (reutilizado en la siguiente llamada del mismo hilo) y los
+# datos para llevar las cajas a coordenadas de la imagen original.
+def letterbox(img, factor: int = 1):
+    height, width = img.shape[:2]
+    ratio = min(AI_INPUT_SIZE / height, AI_INPUT_SIZE / width)
+    new_w, new_h = round(width * ratio), round(height * ratio)
+    left = (AI_INPUT_SIZE - new_w) // 2
+    top = (AI_INPUT_SIZE - new_h) // 2
+
+    canvas = _buffers.canvas
+    canvas[:top] = LETTERBOX_COLOR
+    canvas[top + new_h:] = LETTERBOX_COLOR
+    canvas[:, :left] = LETTERBOX_COLOR
+    canvas[:, left + new_w:] = LETTERBOX_COLOR
+    if (new_w, new_h) != (width, height):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas[top:top + new_h, left:left + new_w] = img
+
+    tensor = _buffers.tensor
+    np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), _INV_255, out=tensor[0], casting="unsafe")
+
+    meta = {
+        "shape": (height * factor, width * factor),
+        "scale": ratio / factor,
+        "pad": (left, top),
+    }
+    return tensor, meta
+
+
+# Fallo del modelo durante un análisis. Se propaga en lugar de devolver un
+# resultado por defecto para que no se guarde en la caché de resultados.
+class InferenceError(Exception):
+    pass
+
+
+# Mide la duración de una etapa del análisis (en milisegundos en timings y en /metrics)
+@contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        ai_stage_duration.observe(elapsed, name)
+        if timings is not None:
+            timings[name] = elapsed * 1000
+
 
 class YOLOHandler:
-    def __init__(self, model_name="yolov8n.onnx"):
-        # En Vercel solo escribimos en /tmp
-        self.model_path = os.path.join("/tmp", model_name)
-        self.session = None
-        self.input_name = None
-        
-        # Intentar descargar el modelo si no existe
-        if not os.path.exists(self.model_path):
-            try:
-                print(f"Descargando modelo {model_name}...")
-                # URL original de Ultralytics redireccionada a assets
-                url = f"https://github.com/ultralytics/assets/releases/download/v8.2.0/{model_name}"
-                urllib.request.urlretrieve(url, self.model_path)
-                print(f"Modelo descargado en {self.model_path}")
-            except Exception as e:
-                print(f"Error crítico al descargar modelo: {e}. Se intentará usar modo degradado.")
-        
-        # Iniciar sesión de ONNX Runtime con manejo de errores robusto
-        try:
-            if os.path.exists(self.model_path):
-                self.session = ort.InferenceSession(self.model_path, providers=['CPUExecutionProvider'])
-                self.input_name = self.session.get_inputs()[0].name
-                print("Sesión de ONNX Runtime inicializada correctamente.")
-            else:
-                print("El modelo no existe en la ruta especificada. Iniciando en modo simulación.")
-        except Exception as e:
-            print(f"Error al inicializar ONNX Runtime: {e}. El sistema entrará en modo de resultados simulados.")
-            self.session = None
+    def __init__(self, manager: ModelManager = model_manager):
+        # La sesión la carga el ModelManager al arrancar la API (no al importar)
+        self.manager = manager
+
+    @property
+    def session(self):
+        return self.manager.session if self.manager.is_ready() else None
+
+    @property
+    def input_name(self):
+        return self.manager.input_name
+
+    @property
+    def batcher(self):
+        return self.manager.batcher if self.manager.is_ready() else None
 
     def preprocess(self, image_bytes):
-        # Convertir bytes a formato OpenCV
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decodificación (reducida cuando la foto es mucho mayor que 640px)
+        img, factor = decode_image(image_bytes)
         if img is None:
             return None, None
-            
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        # Redimensionar a 640x640 (especificación YOLOv8)
-        input_img = cv2.resize(img_rgb, (640, 640))
-        input_img = input_img.transpose(2, 0, 1)  # HWC -> CHW
-        input_img = input_img.reshape(1, 3, 640, 640).astype(np.float32)
-        input_img /= 255.0  # Normalización [0, 1]
         
-        return input_img, img.shape
+        return letterbox(img, factor)
 
-    def detect_and_analyze_biotype(self, image_bytes):
+    def detect_and_analyze_biotype(self, image_bytes, timings=None):
         # Modo degradado si no hay modelo cargado
         if not self.session:
             print("Aviso: Ejecutando detección de biotipo en modo simulación (modelo no cargado).")
             return "Mesomorfo", 0.70 # Retornamos un biotipo promedio para no bloquear al usuario
 
-        input_tensor, orig_shape = self.preprocess(image_bytes)
+        with _stage(timings, "preproceso"):
+            input_tensor, meta = self.preprocess(image_bytes)
         if input_tensor is None:
             return None, 0.0
             
         try:
             # Ejecutar inferencia
-            outputs = self.session.run(None, {self.input_name: input_tensor})
+            with _stage(timings, "inferencia"):
+                outputs = self.batcher.infer(input_tensor)
+            
+            # Clasificación por proporción ancho/alto de la persona más confiable
+            with _stage(timings, "postproceso"):
+                boxes, scores, _ = decode_yolov8(outputs[0], meta, class_ids=[PERSON_CLASS])
+            if not len(boxes):
+                return None, 0.0
             
-            # Devolvemos un valor detectado por la IA pero simulamos la clasificación final por ratio
-            conf = 0.90
-            ratio = 0.42 # Simulado de la detección principal de persona
+            best = scores.argmax()
+            x1, y1, x2, y2 = boxes[best]
+            conf = float(scores[best])
+            ratio = (x2 - x1) / max(y2 - y1, 1e-6)
             
             if ratio < 0.35: biotype = "Ectomorfo"
             elif ratio > 0.45: biotype = "Endomorfo"
@@ -76,27 +253,35 @@ class YOLOHandler:
             return biotype, conf
         except Exception as e:
             print(f"Error durante la inferencia de biotipo: {e}")
-            return "Mesomorfo", 0.50
+            raise InferenceError(f"Error durante la inferencia de biotipo: {e}") from e
 
-    def detect_food(self, image_bytes):
+    def detect_food(self, image_bytes, timings=None):
         # Modo degradado si no hay modelo cargado
         if not self.session:
             return [{"label": "Generic Food", "confidence": 0.50}]
 
-        # Etiquetas de comida comunes en COCO
-        food_labels = {46: "banana", 47: "apple", 48: "sandwich", 49: "orange", 50: "broccoli"}
-        
-        input_tensor, _ = self.preprocess(image_bytes)
+        with _stage(timings, "preproceso"):
+            input_tensor, meta = self.preprocess(image_bytes)
         if input_tensor is None:
             return []
             
         try:
             # Inferimos con el mismo modelo general (YOLOv8n detecta personas y comida)
-            outputs = self.session.run(None, {self.input_name: input_tensor})
+            with _stage(timings, "inferencia"):
+                outputs = self.batcher.infer(input_tensor)
+            
+            # Solo se consideran las clases de COCO que son alimentos
+            with _stage(timings, "postproceso"):
+                boxes, scores, classes = decode_yolov8(outputs[0], meta, class_ids=FOOD_LABELS)
             
-            # Devolvemos un alimento reconocido común si la confianza es alta
-            # Detección simulada pero realista para la demo del proyecto
-            return [{"label": "apple", "confidence": 0.95}]
+            return [
+                {
+                    "label": FOOD_LABELS[int(cls)],
+                    "confidence": round(float(score), 4),
+                    "box": [round(float(v), 1) for v in box]
+                }
+                for box, score, cls in zip(boxes, scores, classes)
+            ]
         except Exception as e:
             print(f"Error durante la inferencia de comida: {e}")
-            return []
+            raise InferenceError(f"Error durante la inferencia de comida: {e}") from e
@@ -1,12 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from collections import OrderedDict
 import os
+import secrets
+import threading
+import time
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 from fastapi import HTTPException, status
 from starlette.requests import Request
 from dotenv import load_dotenv
+from app.utils.token_revocation import token_revocations
 
 # Cargar variables de entorno
 load_dotenv()
@@ -14,15 +20,22 @@ load_dotenv()
 # Configuración JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "tu_clave_secreta_super_segura_cambiar_en_produccion")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 1
+# Duración de los tokens: el de acceso es corto y se renueva con el de refresco
+# en /token/refresh sin volver a pasar por /login (ni por bcrypt)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Tokens ya validados que se guardan en memoria hasta su expiración
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1024"))
 
-# Hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashing de contraseñas (los hashes con otro coste se actualizan al iniciar sesión)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # Modelos para autenticación
 class TokenData(BaseModel):
     user_id: Optional[int] = None
     email: Optional[str] = None
+    id_rol: Optional[int] = None
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -32,6 +45,10 @@ class TokenResponse(BaseModel):
 
 class SimpleTokenResponse(BaseModel):
     access: str
+    refresh: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh: str
 
 class LoginRequest(BaseModel):
     email: str
@@ -46,25 +63,95 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return plain_password == hashed_password
 
+# Verificar contraseña y obtener un hash nuevo si el guardado está desactualizado.
+# Devuelve (válida, nuevo_hash o None). Las contraseñas heredadas en texto plano
+# también se migran a bcrypt.
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except (ValueError, TypeError):
+        if secrets.compare_digest(plain_password.encode(), hashed_password.encode()):
+            return True, pwd_context.hash(plain_password)
+        return False, None
+
 # Generar hash
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-# Crear token JWT
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+# Crear token JWT (cada token lleva su tipo y un identificador único "jti")
+def _create_token(data: dict, token_type: str, expires_delta: timedelta) -> str:
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
+    to_encode.update({
+        "exp": datetime.utcnow() + expires_delta,
+        "type": token_type,
+        "jti": uuid.uuid4().hex
+    })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# Verificar token JWT
-async def verify_token(request: Request) -> TokenData:
-    auth_header = request.headers.get("Authorization")
-    
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    return _create_token(data, "access", expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    return _create_token(data, "refresh", expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+# Caché LRU de tokens decodificados: token -> (TokenData, exp).
+# Evita repetir jwt.decode en cada petición del mismo cliente.
+class TokenCache:
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, token: str) -> Optional[TokenData]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            token_data, expires = entry
+            if expires <= time.time():
+                del self._entries[token]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self._stats["hits"] += 1
+            return token_data
+
+    def store(self, token: str, token_data: TokenData, expires: float):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (token_data, expires)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entradas": len(self._entries),
+                "max_entradas": self.max_entries,
+                "aciertos": self._stats["hits"],
+                "fallos": self._stats["misses"],
+                "tasa_aciertos": self._stats["hits"] / total if total else 0.0,
+            }
+
+
+token_cache = TokenCache()
+
+# Extraer el token de la cabecera Authorization ("Bearer <token>" o solo el token)
+def get_token_from_header(auth_header: Optional[str]) -> str:
     if not auth_header:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,28 +159,58 @@ async def verify_token(request: Request) -> TokenData:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    parts = auth_header.split()
+    if len(parts) == 2:
+        scheme, token = parts
+        if scheme.lower() != "bearer":
+            raise HTTPException(status_code=401, detail="Esquema inválido")
+        return token
+    if len(parts) == 1:
+        return parts[0]
+    raise HTTPException(status_code=401, detail="Formato de token inválido")
+
+# Decodificar un token JWT del tipo esperado y comprobar que no esté revocado
+def decode_payload(token: str, token_type: str = "access") -> dict:
     try:
-        parts = auth_header.split()
-        if len(parts) == 2:
-            scheme, token = parts
-            if scheme.lower() != "bearer":
-                raise HTTPException(status_code=401, detail="Esquema inválido")
-        elif len(parts) == 1:
-            token = parts[0]
-        else:
-            raise ValueError()
-    except Exception:
-        raise HTTPException(status_code=401, detail="Formato de token inválido")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
+    
+    # Los tokens emitidos antes de existir "type" son de acceso
+    if payload.get("type", "access") != token_type:
+        raise HTTPException(status_code=401, detail="Tipo de token inválido")
+    if payload.get("sub") is None or payload.get("email") is None:
+        raise HTTPException(status_code=401, detail="Token incompleto")
+    # Los de refresco se consultan también en la BD (pueden haberse revocado en otra instancia)
+    if token_revocations.is_revoked(payload.get("jti"), check_db=token_type == "refresh"):
+        raise HTTPException(status_code=401, detail="Token revocado")
+    return payload
+
+# Decodificar y validar un token de acceso (con caché hasta su expiración)
+def decode_token(token: str) -> TokenData:
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
     
+    payload = decode_payload(token)
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str: str = payload.get("sub")
-        email: str = payload.get("email")
-        
-        if user_id_str is None or email is None:
-            raise HTTPException(status_code=401, detail="Token incompleto")
-        
-        return TokenData(user_id=int(user_id_str), email=email)
-    except Exception as e:
+        token_data = TokenData(user_id=int(payload["sub"]), email=payload["email"], id_rol=payload.get("rol"))
+    except ValueError as e:
         raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
+    
+    # Sin "exp" el token no caduca: se guarda, pero lo acota el tamaño de la LRU
+    token_cache.store(token, token_data, payload.get("exp", float("inf")))
+    return token_data
+
+# Revocar un token ya validado (logout o rotación del token de refresco).
+# Devuelve False si ya estaba revocado.
+def revoke_token(token: str, payload: dict) -> bool:
+    token_cache.discard(token)
+    if not payload.get("jti"):
+        return True
+    return token_revocations.revoke(payload["jti"], int(payload["sub"]), payload["exp"])
 
+# Verificar token JWT.
+# Se usa como dependencia de FastAPI: Depends(verify_token)
+async def verify_token(request: Request) -> TokenData:
+    return decode_token(get_token_from_header(request.headers.get("Authorization")))
@@ -0,0 +1,160 @@
+import os
+from datetime import datetime
+import psycopg2
+from psycopg2.extras import execute_values
+from fastapi import HTTPException
+from app.config.db_config import db_connection, PoolTimeoutError
+from app.config.schema_registry import schema_registry
+
+# Límite de filas por petición y filas por sentencia INSERT ... VALUES
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "10000"))
+BULK_PAGE_SIZE = int(os.getenv("BULK_PAGE_SIZE", "1000"))
+
+# Columnas de auditoría que se rellenan como en create()
+AUDIT_COLUMNS = ("fecha_creacion", "fecha_actualizacion")
+
+
+def _check_rows(schema, rows: list, conflict_columns: list):
+    if not rows:
+        raise HTTPException(status_code=400, detail="No se enviaron filas")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Máximo {BULK_MAX_ROWS} filas por petición")
+    invalid = [c for c in conflict_columns or () if c not in schema.columns]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Columnas de conflicto no válidas: {', '.join(invalid)}")
+
+    # Filas con columnas desconocidas se reportan como error y no se insertan
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        unknown = [c for c in row if c not in schema.columns]
+        if unknown:
+            errors.append({"indice": index, "error": f"Columnas no válidas: {', '.join(unknown)}"})
+        elif not row:
+            errors.append({"indice": index, "error": "Fila vacía"})
+        else:
+            valid.append((index, row))
+    return valid, errors
+
+
+def _skips_conflicts(schema, columns: tuple, conflict_columns) -> bool:
+    return bool(conflict_columns) and not _update_columns(schema, columns, conflict_columns)
+
+
+# Columnas a actualizar en un conflicto. Si la fila solo trae la llave de
+# conflicto (y las de auditoría) no hay nada que actualizar: DO NOTHING.
+def _update_columns(schema, columns: tuple, conflict_columns) -> list:
+    updates = [c for c in columns if c not in conflict_columns and c not in (schema.primary_key, "fecha_creacion")]
+    if all(c in AUDIT_COLUMNS for c in updates):
+        return []
+    return updates
+
+
+def _insert_sql(schema, columns: tuple, conflict_columns) -> str:
+    sql = f"INSERT INTO {schema.name} ({', '.join(columns)}) VALUES %s"
+    returning = [schema.primary_key]
+    if conflict_columns:
+        # Solo se actualizan las columnas que trae la fila
+        updates = _update_columns(schema, columns, conflict_columns)
+        if updates:
+            assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+            sql += f" ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {assignments}"
+        else:
+            sql += f" ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING"
+            # Las filas omitidas no devuelven nada: se emparejan por su llave de conflicto
+            returning += list(conflict_columns)
+    return sql + f" RETURNING {', '.join(returning)}"
+
+
+# Filas agrupadas por el conjunto de columnas que traen (más las de auditoría),
+# para no escribir DEFAULT ni pisar en un upsert columnas que la fila no envió
+def _group_rows(schema, valid: list, now: datetime) -> dict:
+    groups = {}
+    for index, row in valid:
+        columns = tuple(sorted(row))
+        columns += tuple(c for c in AUDIT_COLUMNS if c in schema.columns and c not in row)
+        values = tuple(row.get(c, now) for c in columns)
+        groups.setdefault(columns, []).append((index, values))
+    return groups
+
+
+# Inserta un grupo con execute_values y anota los ids (None en las filas omitidas por DO NOTHING)
+def _insert_group(cursor, schema, columns: tuple, group: list, conflict_columns, ids: list):
+    conflict_key = tuple(conflict_columns) if conflict_columns else None
+    sql = schema.statement(("bulk", columns, conflict_key), lambda: _insert_sql(schema, columns, conflict_columns))
+    returned = execute_values(cursor, sql, [values for _, values in group], page_size=BULK_PAGE_SIZE, fetch=True)
+
+    if not _skips_conflicts(schema, columns, conflict_columns):
+        for (index, _), (new_id,) in zip(group, returned):
+            ids[index] = new_id
+        return
+
+    positions = [columns.index(c) if c in columns else None for c in conflict_columns]
+    inserted = {tuple(str(v) for v in row[1:]): row[0] for row in returned}
+    for index, values in group:
+        if None not in positions:
+            ids[index] = inserted.pop(tuple(str(values[p]) for p in positions), None)
+
+
+# Inserta (o actualiza con ON CONFLICT) muchas filas en una sola transacción.
+# Camino rápido: execute_values en lotes de BULK_PAGE_SIZE filas, una sentencia
+# por conjunto de columnas. Si alguna fila falla, se repite fila por fila con
+# SAVEPOINT para reportar el error de cada una e insertar las demás (o
+# ninguna, con all_or_nothing). Devuelve ids alineados con la entrada (None en
+# las filas con error y en las omitidas por un conflicto con DO NOTHING).
+# schema: el ya resuelto por el controlador (CrudController._schema traduce sus errores a HTTP)
+def bulk_insert(table: str, rows: list, conflict_columns: list = None, all_or_nothing: bool = False,
+                schema=None) -> dict:
+    schema = schema or schema_registry.get(table)
+    valid, errors = _check_rows(schema, rows, conflict_columns)
+    if errors and all_or_nothing:
+        raise HTTPException(status_code=422, detail={"errores": errors})
+
+    groups = _group_rows(schema, valid, datetime.now())
+    ids = [None] * len(rows)
+
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for columns, group in groups.items():
+                    _insert_group(cursor, schema, columns, group, conflict_columns, ids)
+                conn.commit()
+                return _result(ids, errors)
+            except psycopg2.Error:
+                conn.rollback()
+                ids = [None] * len(rows)
+
+            # Camino lento: una fila por sentencia, cada una protegida por un SAVEPOINT
+            row_errors = []
+            for columns, group in groups.items():
+                for index, values in group:
+                    cursor.execute("SAVEPOINT fila")
+                    try:
+                        _insert_group(cursor, schema, columns, [(index, values)], conflict_columns, ids)
+                        cursor.execute("RELEASE SAVEPOINT fila")
+                    except psycopg2.Error as err:
+                        cursor.execute("ROLLBACK TO SAVEPOINT fila")
+                        ids[index] = None
+                        row_errors.append({"indice": index, "error": str(err).strip()})
+
+            errors = sorted(errors + row_errors, key=lambda e: e["indice"])
+            if errors and all_or_nothing:
+                conn.rollback()
+                raise HTTPException(status_code=422, detail={"errores": errors})
+            conn.commit()
+            return _result(ids, errors)
+    except PoolTimeoutError as err:
+        raise HTTPException(status_code=503, detail=str(err))
+    except psycopg2.Error as err:
+        raise HTTPException(status_code=500, detail=str(err))
+
+
+def _result(ids: list, errors: list) -> dict:
+    created = sum(1 for i in ids if i is not None)
+    skipped = len(ids) - created - len(errors)
+    return {
+        "resultado": f"{created} filas guardadas, {skipped} omitidas por conflicto, {len(errors)} con error",
+        "guardadas": created,
+        "ids": ids,
+        "errores": errors
+    }
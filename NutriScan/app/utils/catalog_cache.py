@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.utils.http_cache import etag_matches
+from app.utils.table_events import subscribe
+
+# Tablas de catálogo (se leen mucho y cambian poco) cuyas lecturas se cachean
+CATALOG_CACHE_TABLES = [t.strip() for t in os.getenv("CATALOG_CACHE_TABLES", "roles,modulos,permisos_roles,alimentos").split(",") if t.strip()]
+# Segundos de vida de una respuesta: acota el desfase con escrituras hechas
+# por otros procesos o fuera de la API, que no invalidan esta caché
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+# Respuestas guardadas por tabla (combinaciones de cursor, límite y campos)
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256"))
+
+
+# Respuesta serializada de una versión de la tabla
+class CatalogEntry:
+
+    def __init__(self, body: bytes, etag: str, expires: float):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+# Caché de lecturas de tablas de catálogo con versión por tabla.
+# Cada escritura confirmada por los controladores (table_events) sube la
+# versión y descarta las respuestas de esa tabla. El ETag combina el id de
+# arranque del proceso, la versión y la consulta, así que es fuerte y no se
+# repite tras un reinicio.
+class CatalogCache:
+
+    def __init__(self, tables: list = CATALOG_CACHE_TABLES, ttl: float = CATALOG_CACHE_TTL,
+                 max_entries: int = CATALOG_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.boot_id = uuid.uuid4().hex[:12]
+        self._versions = {table: 0 for table in tables}
+        self._entries = {table: OrderedDict() for table in tables}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        for table in tables:
+            subscribe(table, lambda action, row, table=table: self.invalidate(table))
+
+    def is_cached(self, table: str) -> bool:
+        return table in self._versions
+
+    def version(self, table: str) -> int:
+        return self._versions[table]
+
+    def get(self, table: str, key: tuple):
+        with self._lock:
+            entries = self._entries[table]
+            entry = entries.get(key)
+            if entry is None or entry.expires <= time.monotonic():
+                entries.pop(key, None)
+                self._stats["misses"] += 1
+                return None
+            entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    # Serializa el resultado leído en la versión indicada. Solo se guarda si la
+    # tabla no cambió mientras se consultaba; la entrada se devuelve igualmente.
+    def store(self, table: str, key: tuple, version: int, payload) -> CatalogEntry:
+        body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=6).hexdigest()
+        entry = CatalogEntry(body, f'"{self.boot_id}-{table}-{version}-{digest}"', time.monotonic() + self.ttl)
+
+        with self._lock:
+            if self._versions[table] == version and self.max_entries > 0:
+                entries = self._entries[table]
+                entries[key] = entry
+                entries.move_to_end(key)
+                while len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, table: str):
+        with self._lock:
+            self._versions[table] += 1
+            self._entries[table].clear()
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        for table in list(self._versions):
+            self.invalidate(table)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {
+                "tablas": {table: {"version": self._versions[table], "entradas": len(self._entries[table])} for table in self._versions},
+                "aciertos": self._stats["hits"],
+                "fallos": self._stats["misses"],
+                "invalidaciones": self._stats["invalidations"],
+                "tasa_aciertos": self._stats["hits"] / total if total else 0.0,
+            }
+
+
+# Respuesta con ETag; 304 sin cuerpo si el cliente ya tiene esa versión.
+# no-cache: el navegador guarda la copia pero revalida siempre con If-None-Match.
+def catalog_response(request: Request, entry: CatalogEntry) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from anyio import CancelScope, CapacityLimiter, to_thread
+from fastapi import HTTPException
+from app.config.db_config import db_connection, db_limiter
+
+# Filas que trae cada viaje del cursor del lado del servidor
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "2000"))
+# Exportaciones simultáneas: cada una retiene una conexión del pool mientras dura
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _ndjson_chunk(columns, rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+# Valida el formato solicitado para una exportación
+def check_export_format(fmt: str):
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {fmt}. Use ndjson o csv")
+
+
+# Ejecuta la consulta con un cursor con nombre (server-side) y va entregando
+# bloques de texto de EXPORT_ITERSIZE filas, sin cargar la tabla en memoria.
+def stream_query(query: str, params: tuple, fmt: str, name: str):
+    with db_connection() as conn:
+        cursor = conn.cursor(name=f"export_{name}_{uuid.uuid4().hex[:8]}")
+        cursor.itersize = EXPORT_ITERSIZE
+        cursor.execute(query, params)
+
+        columns = None
+        while True:
+            rows = cursor.fetchmany(EXPORT_ITERSIZE)
+            if columns is None:
+                columns = [desc[0] for desc in cursor.description]
+                if fmt == "csv":
+                    yield _csv_chunk([columns])
+            if not rows:
+                break
+            yield _ndjson_chunk(columns, rows) if fmt == "ndjson" else _csv_chunk(rows)
+
+        cursor.close()
+
+
+# Limitador de exportaciones; se crea dentro del event loop
+_export_limiter = None
+
+
+# Entrega los bloques de stream_query a la respuesta. Cada exportación ocupa un
+# turno de EXPORT_MAX_CONCURRENT y otro del limitador de la BD durante toda la
+# descarga, así las exportaciones no agotan el pool que usan las demás rutas.
+async def stream_export(chunks):
+    global _export_limiter
+    if _export_limiter is None:
+        _export_limiter = CapacityLimiter(EXPORT_MAX_CONCURRENT)
+
+    # Los turnos se piden a nombre de la exportación y no de la tarea, que
+    # puede no ser la misma que cierra el generador
+    borrower = object()
+    await _export_limiter.acquire_on_behalf_of(borrower)
+    try:
+        await db_limiter().acquire_on_behalf_of(borrower)
+    except BaseException:
+        _export_limiter.release_on_behalf_of(borrower)
+        raise
+
+    try:
+        while True:
+            chunk = await to_thread.run_sync(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # Devuelve la conexión al pool aunque el cliente corte la descarga
+        with CancelScope(shield=True):
+            await to_thread.run_sync(chunks.close)
+        db_limiter().release_on_behalf_of(borrower)
+        _export_limiter.release_on_behalf_of(borrower)
@@ -0,0 +1,169 @@
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from app.config.db_config import db_connection
+from app.utils.table_events import subscribe
+
+# Tabla de etiquetas del modelo -> nombre del alimento en la BD
+FOOD_LABELS_PATH = os.getenv("FOOD_LABELS_PATH", os.path.join(os.path.dirname(__file__), "..", "config", "food_labels.json"))
+# Similitud mínima (trigramas) para aceptar una coincidencia difusa
+FOOD_MATCH_THRESHOLD = float(os.getenv("FOOD_MATCH_THRESHOLD", "0.3"))
+# Segundos tras los que se reconstruye el índice aunque no haya cambios en este
+# proceso (escrituras hechas por otros workers o fuera de la API)
+FOOD_CATALOG_TTL = float(os.getenv("FOOD_CATALOG_TTL", "60"))
+
+CATALOG_FIELDS = ("id_alimento", "nombre", "categoria", "calorias", "proteinas_g", "carbohidratos_g", "grasas_g")
+
+
+# Minúsculas, sin tildes y solo caracteres alfanuméricos separados por espacio
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+# Trigramas al estilo pg_trgm: cada palabra con dos espacios delante y uno detrás
+def trigrams(text: str) -> set:
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def load_label_map(path: str = FOOD_LABELS_PATH) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {normalize(label): name for label, name in json.load(f).items()}
+    except (OSError, ValueError) as e:
+        print(f"No se pudo leer la tabla de etiquetas {path}: {e}")
+        return {}
+
+
+# Catálogo de alimentos activos en memoria con índice de prefijos y de trigramas.
+# Se carga en el primer uso, se marca como desactualizado cuando
+# AlimentosController crea, actualiza o desactiva filas y caduca tras FOOD_CATALOG_TTL.
+class FoodCatalog:
+
+    def __init__(self, ttl: float = FOOD_CATALOG_TTL):
+        self.ttl = ttl
+        self.label_map = load_label_map()
+        # Índice completo; se reemplaza de una vez en cada recarga
+        self._index = None
+        self._stale = True
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_):
+        self._stale = True
+
+    def needs_load(self) -> bool:
+        return self._stale or self._index is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self):
+        with self._lock:
+            # Otro hilo pudo recargarlo mientras se esperaba el bloqueo
+            if not self.needs_load():
+                return
+            self._build()
+
+    def _build(self):
+        # Una invalidación durante la carga vuelve a marcar el catálogo como desactualizado
+        self._stale = False
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {', '.join(CATALOG_FIELDS)} FROM alimentos WHERE estado = 'Activo' ORDER BY id_alimento")
+                rows = [dict(zip(CATALOG_FIELDS, row)) for row in cursor.fetchall()]
+        except Exception:
+            self._stale = True
+            raise
+
+        foods, by_name, words, grams, gram_counts = {}, {}, [], {}, {}
+        for food in rows:
+            food_id = food["id_alimento"]
+            name = normalize(food["nombre"])
+            foods[food_id] = food
+            by_name.setdefault(name, food_id)
+            words.extend((word, food_id) for word in name.split())
+            name_grams = trigrams(name)
+            gram_counts[food_id] = len(name_grams)
+            for gram in name_grams:
+                grams.setdefault(gram, set()).add(food_id)
+
+        self._index = {
+            "foods": foods,
+            "by_name": by_name,
+            "names": sorted(by_name),
+            "words": sorted(words),
+            "trigrams": grams,
+            "gram_counts": gram_counts,
+        }
+        self._loaded_at = time.monotonic()
+
+    # Si la recarga falla y ya había un índice, se sigue usando el anterior
+    def _get_index(self) -> dict:
+        if self.needs_load():
+            try:
+                self.load()
+            except Exception as e:
+                if self._index is None:
+                    raise
+                print(f"No se pudo recargar el catálogo de alimentos: {e}")
+        return self._index
+
+    # Nombre buscado para una etiqueta del modelo (o la etiqueta misma)
+    def name_for_label(self, label: str) -> str:
+        return self.label_map.get(normalize(label), label)
+
+    def _prefix_match(self, index: dict, query: str):
+        # Nombre completo que empieza por la consulta
+        names = index["names"]
+        i = bisect.bisect_left(names, query)
+        if i < len(names) and names[i].startswith(query):
+            return index["by_name"][names[i]]
+        # Alguna palabra del nombre que empieza por la consulta
+        words = index["words"]
+        i = bisect.bisect_left(words, (query,))
+        if i < len(words) and words[i][0].startswith(query):
+            return words[i][1]
+        return None
+
+    def _trigram_match(self, index: dict, query: str):
+        query_grams = trigrams(query)
+        counts = {}
+        for gram in query_grams:
+            for food_id in index["trigrams"].get(gram, ()):
+                counts[food_id] = counts.get(food_id, 0) + 1
+
+        best, best_score = None, FOOD_MATCH_THRESHOLD
+        for food_id, common in counts.items():
+            score = common / (len(query_grams) + index["gram_counts"][food_id] - common)
+            if score >= best_score:
+                best, best_score = food_id, score
+        return best
+
+    # Busca un alimento por nombre: exacto, por prefijo y luego por similitud de trigramas
+    def find(self, name: str):
+        index = self._get_index()
+        query = normalize(name)
+        if not query:
+            return None
+
+        food_id = index["by_name"].get(query)
+        if food_id is None:
+            food_id = self._prefix_match(index, query)
+        if food_id is None:
+            food_id = self._trigram_match(index, query)
+        return dict(index["foods"][food_id]) if food_id is not None else None
+
+    def find_label(self, label: str):
+        return self.find(self.name_for_label(label))
+
+
+food_catalog = FoodCatalog()
+subscribe("alimentos", food_catalog.invalidate)
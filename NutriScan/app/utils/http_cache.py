@@ -0,0 +1,10 @@
+from fastapi import Request
+
+
+# True si el cliente ya tiene la representación con ese ETag (If-None-Match)
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import random
+import time
+from urllib.parse import urlsplit
+import httpx
+
+# Configuración del cliente HTTP compartido para llamadas a otros servicios
+HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "10"))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "20"))
+HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+# Peticiones simultáneas como máximo hacia un mismo host
+HTTP_CLIENT_MAX_PER_HOST = int(os.getenv("HTTP_CLIENT_MAX_PER_HOST", "20"))
+# HTTP/2 solo si está instalado el paquete h2 (httpx[http2])
+HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "1") == "1"
+
+# Reintentos de peticiones idempotentes con espera exponencial y jitter
+HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", "2"))
+HTTP_CLIENT_BACKOFF = float(os.getenv("HTTP_CLIENT_BACKOFF", "0.2"))
+HTTP_CLIENT_BACKOFF_MAX = float(os.getenv("HTTP_CLIENT_BACKOFF_MAX", "2"))
+RETRY_STATUS = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Circuit breaker por host: tras N fallos seguidos se deja de llamar durante un tiempo
+HTTP_CLIENT_BREAKER_FAILURES = int(os.getenv("HTTP_CLIENT_BREAKER_FAILURES", "5"))
+HTTP_CLIENT_BREAKER_RESET = float(os.getenv("HTTP_CLIENT_BREAKER_RESET", "30"))
+
+# Estados del circuit breaker
+CLOSED = "cerrado"
+OPEN = "abierto"
+HALF_OPEN = "semiabierto"
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CircuitOpenError(httpx.HTTPError):
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuito abierto para {host}, reintento en {retry_in:.0f} s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+# Cerrado: pasan todas las peticiones. Abierto: se rechazan sin llamar al host.
+# Semiabierto (al vencer el tiempo): pasa una petición de prueba que decide si
+# se vuelve a cerrar o a abrir.
+class CircuitBreaker:
+
+    def __init__(self, host: str, max_failures: int = HTTP_CLIENT_BREAKER_FAILURES,
+                 reset_timeout: float = HTTP_CLIENT_BREAKER_RESET):
+        self.host = host
+        self.max_failures = max_failures
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def before_request(self):
+        if self.state == CLOSED:
+            return
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(self.host, remaining)
+        # La petición de prueba dispone de otro periodo completo; mientras tanto
+        # el resto se sigue rechazando
+        self.state = HALF_OPEN
+        self.opened_at = time.monotonic()
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.max_failures:
+            if self.state != OPEN:
+                print(f"Circuito abierto para {self.host} tras {self.failures} fallos")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+# Cliente httpx.AsyncClient compartido por todas las llamadas salientes:
+# reutiliza conexiones (keep-alive), limita la concurrencia por host, reintenta
+# errores transitorios y corta las llamadas a un host que está fallando.
+# Se crea en el lifespan de la aplicación y se cierra al apagarla.
+class OutboundClient:
+
+    def __init__(self):
+        self._client = None
+        self._host_slots = {}
+        self._breakers = {}
+
+    async def start(self):
+        if self._client is not None:
+            return
+        http2 = HTTP_CLIENT_HTTP2 and http2_available()
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=HTTP_CLIENT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_CLIENT_KEEPALIVE_EXPIRY
+            ),
+            headers={"User-Agent": "NutriScan-API"}
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        # Los semáforos quedan ligados al event loop que se cierra
+        self._host_slots = {}
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host)
+        return self._breakers[host]
+
+    def _slots(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(HTTP_CLIENT_MAX_PER_HOST)
+        return self._host_slots[host]
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # "Full jitter": espera aleatoria entre 0 y el tope exponencial
+        return random.uniform(0, min(HTTP_CLIENT_BACKOFF_MAX, HTTP_CLIENT_BACKOFF * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self._client is None:
+            await self.start()
+
+        host = self._host(url)
+        breaker = self._breaker(host)
+        retries = HTTP_CLIENT_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+
+        for attempt in range(retries + 1):
+            breaker.before_request()
+            try:
+                async with self._slots(host):
+                    response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                if attempt == retries:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+
+http_client = OutboundClient()
@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from app.utils.metrics import ai_batch_size, ai_session_run_duration
+
+# Configuración del micro-batching de inferencia
+AI_MAX_BATCH = int(os.getenv("AI_MAX_BATCH", "8"))
+AI_MAX_WAIT_MS = float(os.getenv("AI_MAX_WAIT_MS", "5"))
+
+
+# Agrupa peticiones concurrentes de inferencia en un solo lote NCHW.
+# Cada llamada a infer() encola su tensor (1x3xHxW) y espera; un hilo de fondo
+# junta hasta max_batch tensores o espera como máximo max_wait_ms, ejecuta una
+# única llamada a session.run y reparte las salidas a cada solicitante.
+class InferenceBatcher:
+
+    def __init__(self, session, input_name: str, max_batch: int = AI_MAX_BATCH, max_wait_ms: float = AI_MAX_WAIT_MS):
+        self.session = session
+        self.input_name = input_name
+        self.max_wait = max_wait_ms / 1000.0
+
+        # Un modelo exportado con lote fijo (p. ej. [1, 3, 640, 640]) no admite lotes.
+        # El yolov8n.onnx publicado por Ultralytics es de lote 1: para agrupar hay
+        # que exportarlo con eje dinámico y apuntar AI_MODEL_PATH al archivo
+        batch_dim = session.get_inputs()[0].shape[0]
+        self.dynamic = not isinstance(batch_dim, int)
+        if not self.dynamic:
+            if max_batch > batch_dim:
+                print(
+                    f"Aviso: el modelo tiene tamaño de lote fijo ({batch_dim}); micro-batching limitado a {batch_dim}. "
+                    "Exporte el modelo con `yolo export model=yolov8n.pt format=onnx dynamic=True` "
+                    "y configure AI_MODEL_PATH para agrupar peticiones."
+                )
+            max_batch = min(max_batch, batch_dim)
+        self.max_batch = max(1, max_batch)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "largest_batch": 0}
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name="inference-batcher", daemon=True)
+                    self._thread.start()
+
+    # Ejecuta la inferencia de un tensor y devuelve las salidas con lote 1
+    def infer(self, tensor: np.ndarray, timeout: float = None) -> list:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((tensor, future))
+        return future.result(timeout)
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            tensors = [tensor for tensor, _ in batch]
+            inputs = tensors[0] if len(tensors) == 1 else np.concatenate(tensors, axis=0)
+
+            try:
+                with ai_session_run_duration.time():
+                    outputs = self.session.run(None, {self.input_name: inputs})
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(batch):
+                future.set_result([output[i:i + 1] for output in outputs])
+
+            ai_batch_size.observe(len(batch))
+            self._stats["batches"] += 1
+            self._stats["items"] += len(batch)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+
+    def stats(self) -> dict:
+        batches = self._stats["batches"]
+        return {
+            "max_batch": self.max_batch,
+            "lote_dinamico": self.dynamic,
+            "max_wait_ms": self.max_wait * 1000,
+            "lotes": batches,
+            "imagenes": self._stats["items"],
+            "lote_promedio": self._stats["items"] / batches if batches else 0.0,
+            "lote_maximo": self._stats["largest_batch"],
+            "en_cola": self._queue.qsize(),
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+
+# Configuración del pool de inferencia
+AI_WORKERS = int(os.getenv("AI_WORKERS", "8"))
+# Máximo de imágenes en proceso o en espera; por encima se responde 429
+AI_MAX_PENDING = int(os.getenv("AI_MAX_PENDING", "32"))
+AI_TASK_TIMEOUT = float(os.getenv("AI_TASK_TIMEOUT", "30"))
+
+
+# Ejecuta el procesamiento de imágenes (decodificación, preproceso e inferencia)
+# en hilos dedicados, fuera del event loop, con una cola acotada.
+class InferencePool:
+
+    def __init__(self, workers: int = AI_WORKERS, max_pending: int = AI_MAX_PENDING, timeout: float = AI_TASK_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"completed": 0, "rejected": 0, "timeouts": 0}
+        self._stage_totals = {}
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _record(self, timings: dict):
+        with self._lock:
+            self._stats["completed"] += 1
+            for stage, ms in timings.items():
+                self._stage_totals[stage] = self._stage_totals.get(stage, 0.0) + ms
+
+    # Ejecuta func(*args, timings=dict) en el pool y devuelve (resultado, tiempos en ms por etapa)
+    async def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="El servicio de análisis de imágenes está ocupado, intente de nuevo en unos segundos",
+                headers={"Retry-After": "1"}
+            )
+
+        with self._lock:
+            self._pending += 1
+
+        timings = {}
+        queued_at = time.perf_counter()
+
+        def task():
+            timings["cola"] = (time.perf_counter() - queued_at) * 1000
+            return func(*args, timings=timings)
+
+        future = self._executor.submit(task)
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise HTTPException(status_code=504, detail="El análisis de la imagen excedió el tiempo límite")
+
+        timings["total"] = (time.perf_counter() - queued_at) * 1000
+        self._record(timings)
+        return result, {stage: round(ms, 2) for stage, ms in timings.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "hilos": self.workers,
+                "max_pendientes": self.max_pending,
+                "pendientes": self._pending,
+                "completadas": completed,
+                "rechazadas": self._stats["rejected"],
+                "timeouts": self._stats["timeouts"],
+                "promedio_ms": {
+                    stage: total / completed for stage, total in self._stage_totals.items()
+                } if completed else {},
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+inference_pool = InferencePool()
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import httpx
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.utils.http_client import http_client, CircuitOpenError
+
+# URL del servicio de ubicaciones
+NODE_SERVICE_URL = os.getenv("NODE_SERVICE_URL", "https://proyecto-rc-jju7.vercel.app/api/ubicaciones")
+# Segundos en que la copia se considera fresca y, después, en que se sirve
+# mientras se actualiza en segundo plano (stale-while-revalidate)
+LOCATIONS_TTL = float(os.getenv("LOCATIONS_TTL", "600"))
+LOCATIONS_STALE_TTL = float(os.getenv("LOCATIONS_STALE_TTL", "86400"))
+# Copia local de la última respuesta válida, para cuando el servicio no responde
+# (en Vercel solo se puede escribir en /tmp)
+LOCATIONS_SNAPSHOT_PATH = os.getenv("LOCATIONS_SNAPSHOT_PATH", "/tmp/ubicaciones_snapshot.json")
+# Tras un fallo del servicio, segundos sin volver a intentarlo mientras haya copia que servir
+LOCATIONS_RETRY_AFTER = float(os.getenv("LOCATIONS_RETRY_AFTER", "30"))
+
+
+# Campos de cada fila que se usan para construir el árbol
+LOCATION_FIELDS = {"id_ciudad", "pais", "departamento", "ciudad"}
+
+
+class UpstreamError(Exception):
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Agrupa las filas planas en país -> departamento -> ciudad
+def build_tree(rows: list) -> list:
+    countries = {}
+    for row in rows:
+        departments = countries.setdefault(row["pais"], {})
+        departments.setdefault(row["departamento"], []).append({
+            "id_ciudad": row["id_ciudad"],
+            "ciudad": row["ciudad"]
+        })
+
+    return [
+        {
+            "pais": pais,
+            "departamentos": [
+                {"departamento": departamento, "ciudades": sorted(ciudades, key=lambda c: c["ciudad"])}
+                for departamento, ciudades in sorted(departments.items())
+            ]
+        }
+        for pais, departments in sorted(countries.items())
+    ]
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# Respuestas ya serializadas de una versión de los datos, con su ETag
+class LocationsSnapshot:
+
+    def __init__(self, rows: list, fetched_at: float):
+        self.fetched_at = fetched_at
+        self.total = len(rows)
+        # Mismo formato que devuelve el servicio de Node: {total, data}
+        self.flat = _encode({"total": len(rows), "data": rows})
+        self.tree = _encode({"total": len(rows), "paises": build_tree(rows)})
+        self.etags = {"flat": _etag(self.flat), "tree": _etag(self.tree)}
+
+    def body(self, view: str) -> bytes:
+        return self.flat if view == "flat" else self.tree
+
+
+async def fetch_locations() -> list:
+    try:
+        response = await http_client.get(NODE_SERVICE_URL)
+    except CircuitOpenError:
+        raise UpstreamError(503, "El servicio de ubicaciones no está disponible temporalmente.")
+    except httpx.TimeoutException:
+        raise UpstreamError(504, "Tiempo de espera agotado.")
+    except httpx.HTTPError:
+        raise UpstreamError(502, "Error de conexión.")
+
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, "El servicio de ubicaciones devolvió un error.")
+    try:
+        rows = response.json()["data"]
+    except (ValueError, KeyError, TypeError):
+        raise UpstreamError(502, "Respuesta inválida del servicio de ubicaciones.")
+    # Se valida antes de reemplazar la copia: una fila incompleta no debe
+    # romper build_tree ni desplazar la última copia válida
+    if not isinstance(rows, list) or not all(isinstance(row, dict) and LOCATION_FIELDS <= row.keys() for row in rows):
+        raise UpstreamError(502, "Respuesta inválida del servicio de ubicaciones.")
+    return rows
+
+
+# Caché en proceso del catálogo de ubicaciones.
+# - Fresca (< LOCATIONS_TTL): se sirve directamente.
+# - Vencida pero dentro de LOCATIONS_STALE_TTL: se sirve y se actualiza en segundo plano.
+# - Sin copia utilizable: se consulta el servicio; si falla se usa la última copia
+#   en memoria o la guardada en disco.
+# Solo hay una consulta al servicio en curso a la vez.
+class LocationsCache:
+
+    def __init__(self, ttl: float = LOCATIONS_TTL, stale_ttl: float = LOCATIONS_STALE_TTL,
+                 snapshot_path: str = LOCATIONS_SNAPSHOT_PATH):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.snapshot_path = snapshot_path
+        self._snapshot = None
+        self._refresh_task = None
+        self._retry_at = 0.0
+
+    def _save_snapshot(self, rows: list):
+        try:
+            with open(self.snapshot_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": time.time(), "data": rows}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"No se pudo guardar la copia local de ubicaciones: {e}")
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            return LocationsSnapshot(saved["data"], saved["fetched_at"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"No hay copia local de ubicaciones utilizable: {e}")
+            return None
+
+    async def _fetch(self) -> LocationsSnapshot:
+        try:
+            rows = await fetch_locations()
+        except UpstreamError:
+            self._retry_at = time.time() + LOCATIONS_RETRY_AFTER
+            raise
+        snapshot = LocationsSnapshot(rows, time.time())
+        self._snapshot = snapshot
+        await run_in_threadpool(self._save_snapshot, rows)
+        return snapshot
+
+    # Consulta única compartida por todas las peticiones concurrentes
+    def _refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+            self._refresh_task.add_done_callback(self._log_background_error)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"No se pudo actualizar el catálogo de ubicaciones: {task.exception()}")
+
+    async def get(self) -> LocationsSnapshot:
+        now = time.time()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = now - snapshot.fetched_at
+            if age < self.ttl or now < self._retry_at:
+                return snapshot
+            if age < self.ttl + self.stale_ttl:
+                self._refresh()
+                return snapshot
+
+        try:
+            return await asyncio.shield(self._refresh())
+        except UpstreamError as e:
+            fallback = self._snapshot or await run_in_threadpool(self._load_snapshot)
+            if fallback is None:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            self._snapshot = fallback
+            return fallback
+
+
+locations_cache = LocationsCache()
@@ -0,0 +1,85 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from fastapi import HTTPException
+from starlette.requests import Request
+
+# Intentos fallidos permitidos por cuenta y por IP dentro de la ventana
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_FAILURES_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILURES_ACCOUNT", "5"))
+LOGIN_MAX_FAILURES_IP = int(os.getenv("LOGIN_MAX_FAILURES_IP", "20"))
+# Claves (cuentas + IPs) recordadas como máximo
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "10000"))
+# Detrás de un proxy (p. ej. Vercel) la IP real llega en X-Forwarded-For
+LOGIN_TRUST_PROXY = os.getenv("LOGIN_TRUST_PROXY", "0") == "1"
+
+
+def client_ip(request: Request) -> str:
+    if LOGIN_TRUST_PROXY:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "desconocido"
+
+
+# Limita los intentos fallidos de inicio de sesión con una ventana deslizante
+# por cuenta (email) y por IP. Un login correcto limpia el contador de la cuenta.
+class LoginThrottle:
+
+    def __init__(self, window: float = LOGIN_WINDOW_SECONDS, max_account: int = LOGIN_MAX_FAILURES_ACCOUNT,
+                 max_ip: int = LOGIN_MAX_FAILURES_IP, max_keys: int = LOGIN_THROTTLE_MAX_KEYS):
+        self.window = window
+        self.limits = {"cuenta": max_account, "ip": max_ip}
+        self.max_keys = max_keys
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _keys(self, email: str, ip: str):
+        return [("cuenta", email.strip().lower()), ("ip", ip)]
+
+    def _recent(self, key, now: float):
+        attempts = self._failures.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._failures[key]
+            return None
+        return attempts
+
+    # Lanza 429 si la cuenta o la IP superaron el máximo de fallos
+    def check(self, email: str, ip: str):
+        now = time.monotonic()
+        retry_after = 0
+        with self._lock:
+            for key in self._keys(email, ip):
+                attempts = self._recent(key, now)
+                if attempts and len(attempts) >= self.limits[key[0]]:
+                    retry_after = max(retry_after, attempts[0] + self.window - now)
+
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados intentos de inicio de sesión fallidos, intente más tarde",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    def record_failure(self, email: str, ip: str):
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(email, ip):
+                attempts = self._failures.setdefault(key, deque(maxlen=self.limits[key[0]]))
+                attempts.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def record_success(self, email: str):
+        with self._lock:
+            self._failures.pop(self._keys(email, "")[0], None)
+
+
+login_throttle = LoginThrottle()
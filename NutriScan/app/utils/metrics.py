@@ -0,0 +1,195 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Métricas en formato de texto de Prometheus (GET /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Límites de los histogramas de duración, en segundos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+# Cada serie guarda conteos por intervalo (no acumulados) para que observe()
+# solo incremente una posición; se acumulan al exportar.
+class Histogram:
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(label_values, list(counts), total) for label_values, (counts, total) in self._series.items()]
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+# Valor leído al exportar: la función devuelve un número o {valores_de_etiquetas: número}
+class Gauge:
+
+    def __init__(self, name: str, help: str, func, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.func = func
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.func()
+        except Exception as e:
+            print(f"No se pudo leer la métrica {self.name}: {e}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, func, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, help, func, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Métricas compartidas por la API, la base de datos y la inferencia
+http_requests_total = metrics.counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status"))
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP por ruta", ("method", "route"))
+db_pool_acquire_duration = metrics.histogram(
+    "db_pool_acquire_seconds", "Espera para obtener una conexión del pool")
+db_query_duration = metrics.histogram(
+    "db_query_duration_seconds", "Duración de las consultas por operación y tabla", ("operation", "table"))
+db_query_errors_total = metrics.counter(
+    "db_query_errors_total", "Consultas que terminaron en error", ("operation", "table"))
+ai_session_run_duration = metrics.histogram(
+    "ai_session_run_seconds", "Duración de session.run del modelo por lote")
+ai_batch_size = metrics.histogram(
+    "ai_batch_size", "Imágenes por lote de inferencia", buckets=(1, 2, 4, 8, 16, 32))
+ai_stage_duration = metrics.histogram(
+    "ai_stage_seconds", "Duración de las etapas del análisis de imágenes", ("stage",))
+
+
+# Middleware ASGI: cuenta y mide cada petición por método, plantilla de ruta
+# (p. ej. /alimentos/{item_id}, para no crear una serie por id) y estado.
+class MetricsMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # El router deja la ruta resuelta en el mismo scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "sin_ruta"
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - start, method, path)
+            http_requests_total.inc(method, path, str(status))
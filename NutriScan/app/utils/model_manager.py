@@ -0,0 +1,187 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+import numpy as np
+import onnxruntime as ort
+from app.utils.inference_batcher import InferenceBatcher
+
+# Ubicación del modelo: ruta configurable, artefacto empaquetado o caché en /tmp
+MODEL_NAME = os.getenv("AI_MODEL_NAME", "yolov8n.onnx")
+BUNDLED_MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "modelos")
+AI_MODEL_PATH = os.getenv("AI_MODEL_PATH")
+AI_MODEL_SHA256 = os.getenv("AI_MODEL_SHA256", "").lower()
+# Descarga opcional cuando no hay modelo local (AI_MODEL_DOWNLOAD=0 para trabajar sin red).
+# El modelo descargado tiene lote fijo 1 y desactiva el micro-batching; para
+# agrupar peticiones se exporta con `yolo export model=yolov8n.pt format=onnx dynamic=True`
+# y se indica su ruta en AI_MODEL_PATH (o se copia a modelos/)
+AI_MODEL_URL = os.getenv("AI_MODEL_URL", f"https://github.com/ultralytics/assets/releases/download/v8.2.0/{MODEL_NAME}")
+AI_MODEL_DOWNLOAD = os.getenv("AI_MODEL_DOWNLOAD", "1") == "1"
+AI_MODEL_DOWNLOAD_TIMEOUT = float(os.getenv("AI_MODEL_DOWNLOAD_TIMEOUT", "60"))
+
+# Opciones de la sesión de ONNX Runtime (0 = que ONNX Runtime decida)
+AI_INTRA_OP_THREADS = int(os.getenv("AI_INTRA_OP_THREADS", "0"))
+AI_INTER_OP_THREADS = int(os.getenv("AI_INTER_OP_THREADS", "1"))
+AI_WARMUP_RUNS = int(os.getenv("AI_WARMUP_RUNS", "2"))
+
+# Estados del modelo
+PENDING = "pendiente"
+LOADING = "cargando"
+READY = "listo"
+UNAVAILABLE = "no_disponible"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Carga el modelo una sola vez en segundo plano al arrancar la API:
+# resuelve la ruta, valida el checksum, crea la sesión con opciones ajustadas
+# y ejecuta inferencias de calentamiento. Solo se considera listo cuando el
+# modelo está "caliente".
+class ModelManager:
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        self.model_name = model_name
+        self.state = PENDING
+        self.error = None
+        self.model_path = None
+        self.version = None
+        self.session = None
+        self.input_name = None
+        self.batcher = None
+        self.load_time_ms = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def _candidate_paths(self) -> list:
+        paths = []
+        if AI_MODEL_PATH:
+            paths.append(AI_MODEL_PATH)
+        paths.append(os.path.join(BUNDLED_MODEL_DIR, self.model_name))
+        # En Vercel solo escribimos en /tmp
+        paths.append(os.path.join("/tmp", self.model_name))
+        return paths
+
+    def _resolve_path(self) -> str:
+        for path in self._candidate_paths():
+            if os.path.exists(path):
+                return path
+
+        if not AI_MODEL_DOWNLOAD:
+            return None
+
+        target = os.path.join("/tmp", self.model_name)
+        print(f"Descargando modelo {self.model_name}...")
+        self._download(AI_MODEL_URL, target)
+        print(f"Modelo descargado en {target}")
+        return target
+
+    # Descarga a un archivo temporal en el mismo directorio y solo lo mueve a
+    # la ruta final (os.replace es atómico) si está completo: así una descarga
+    # cortada, o de otra instancia en paralelo, nunca deja un modelo truncado.
+    def _download(self, url: str, target: str):
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{self.model_name}.", suffix=".part", dir=os.path.dirname(target))
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as f, urllib.request.urlopen(url, timeout=AI_MODEL_DOWNLOAD_TIMEOUT) as response:
+                expected = int(response.headers.get("Content-Length") or 0)
+                for chunk in iter(lambda: response.read(1 << 20), b""):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+
+            if size == 0 or (expected and size != expected):
+                raise IOError(f"Descarga incompleta de {url}: {size} de {expected or '?'} bytes")
+            if AI_MODEL_SHA256 and digest.hexdigest() != AI_MODEL_SHA256:
+                raise ValueError(f"Checksum inválido para la descarga de {url}: {digest.hexdigest()}")
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _session_options(self):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = AI_INTRA_OP_THREADS
+        options.inter_op_num_threads = AI_INTER_OP_THREADS
+        return options
+
+    def _warmup(self, session, input_name):
+        shape = [dim if isinstance(dim, int) else (1 if i == 0 else 640)
+                 for i, dim in enumerate(session.get_inputs()[0].shape)]
+        dummy = np.zeros(shape, dtype=np.float32)
+        for _ in range(AI_WARMUP_RUNS):
+            session.run(None, {input_name: dummy})
+
+    def load(self):
+        with self._lock:
+            self.state = LOADING
+            self._ready.clear()
+            start = time.perf_counter()
+            try:
+                path = self._resolve_path()
+                if path is None:
+                    raise FileNotFoundError(f"No se encontró el modelo {self.model_name} y la descarga está desactivada")
+
+                version = file_sha256(path)
+                if AI_MODEL_SHA256 and version != AI_MODEL_SHA256:
+                    raise ValueError(f"Checksum inválido para {path}: {version}")
+
+                session = ort.InferenceSession(path, sess_options=self._session_options(), providers=["CPUExecutionProvider"])
+                input_name = session.get_inputs()[0].name
+                self._warmup(session, input_name)
+
+                self.model_path = path
+                self.version = version[:12]
+                self.session = session
+                self.input_name = input_name
+                # Las peticiones concurrentes se agrupan en un solo session.run
+                self.batcher = InferenceBatcher(session, input_name)
+                self.load_time_ms = (time.perf_counter() - start) * 1000
+                self.error = None
+                self.state = READY
+                print(f"Modelo {self.model_name} listo (versión {self.version}) en {self.load_time_ms:.0f} ms.")
+            except Exception as e:
+                self.error = str(e)
+                self.state = UNAVAILABLE
+                print(f"No se pudo cargar el modelo: {e}. El sistema entrará en modo de resultados simulados.")
+            finally:
+                self._ready.set()
+
+    # Inicia la carga en segundo plano (idempotente)
+    def start(self):
+        with self._lock:
+            if self.state != PENDING:
+                return
+            self.state = LOADING
+        threading.Thread(target=self.load, name="model-loader", daemon=True).start()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        self._ready.wait(timeout)
+        return self.state == READY
+
+    def is_ready(self) -> bool:
+        return self.state == READY
+
+    def status(self) -> dict:
+        return {
+            "estado": self.state,
+            "modelo": self.model_name,
+            "ruta": self.model_path,
+            "version": self.version,
+            "carga_ms": self.load_time_ms,
+            "error": self.error,
+        }
+
+
+model_manager = ModelManager()
@@ -0,0 +1,34 @@
+import os
+from fastapi import HTTPException
+
+# Límites de los listados paginados
+DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+
+
+# Valida el parámetro fields= ("id,nombre,...") contra las columnas permitidas.
+# La llave del cursor siempre se incluye para poder calcular la siguiente página.
+# Las columnas se devuelven en el orden de available (no en el de la petición),
+# así el mismo conjunto de campos produce siempre la misma consulta.
+def parse_fields(fields, available, key: str) -> list:
+    if not fields:
+        return list(available)
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sorted(f for f in requested if f not in available)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(unknown)}")
+
+    requested.add(key)
+    return [f for f in available if f in requested]
+
+
+# Respuesta de una página obtenida con LIMIT limit + 1.
+# "siguiente" es el valor a enviar como after_id para pedir la próxima página.
+def paginate(rows: list, key: str, limit: int) -> dict:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "resultado": rows,
+        "siguiente": rows[-1][key] if has_more and rows else None,
+    }
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app.utils.auth import pwd_context, verify_and_update_password
+
+# Hilos dedicados a bcrypt (bcrypt libera el GIL mientras calcula)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Verificaciones en proceso o en espera; por encima se responde 429
+LOGIN_MAX_CONCURRENT = int(os.getenv("LOGIN_MAX_CONCURRENT", str(PASSWORD_WORKERS * 4)))
+
+
+# Ejecuta la verificación y el hash de contraseñas en un pool de hilos
+# acotado, fuera del event loop, para que una ráfaga de logins no bloquee
+# el resto de la API.
+class PasswordPool:
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_concurrent: int = LOGIN_MAX_CONCURRENT):
+        self.workers = workers
+        self.max_concurrent = max_concurrent
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._dummy_hash = None
+
+    async def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados inicios de sesión simultáneos, intente de nuevo en unos segundos",
+                headers={"Retry-After": "1"}
+            )
+        try:
+            return await asyncio.wrap_future(self._executor.submit(func, *args))
+        finally:
+            self._slots.release()
+
+    # Hash de referencia para usuarios inexistentes: el tiempo de respuesta
+    # no revela si el email está registrado
+    def _verify_missing(self, plain_password: str):
+        if self._dummy_hash is None:
+            self._dummy_hash = pwd_context.hash("usuario-inexistente")
+        pwd_context.verify(plain_password, self._dummy_hash)
+        return False, None
+
+    # Devuelve (válida, nuevo_hash o None); hashed_password None si el usuario no existe
+    async def verify(self, plain_password: str, hashed_password: str = None):
+        if hashed_password is None:
+            return await self._run(self._verify_missing, plain_password)
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run(pwd_context.hash, plain_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_pool = PasswordPool()
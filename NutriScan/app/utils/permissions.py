@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from fastapi import Depends, HTTPException, Request
+from app.config.db_config import db_connection, run_db
+from app.utils.auth import verify_token, TokenData
+from app.utils.table_events import subscribe
+
+# Permisos de permisos_roles como bits
+LEER = 1
+ESCRIBIR = 2
+EDITAR = 4
+
+# Segundos tras los que se recarga la matriz aunque no haya cambios en este
+# proceso (escrituras hechas por otras instancias o fuera de la API)
+PERMISSIONS_TTL = float(os.getenv("PERMISSIONS_TTL", "60"))
+
+# Módulo que protege las escrituras de cada tabla CRUD
+TABLE_MODULES = {
+    "roles": "Usuarios",
+    "modulos": "Usuarios",
+    "permisos_roles": "Usuarios",
+    "alimentos": "Alimentos",
+}
+
+_EMPTY = {}
+
+
+# Matriz rol -> módulo -> bits de permiso, compilada desde roles, modulos y
+# permisos_roles (solo filas activas). Cada recarga reemplaza el diccionario
+# completo, así una comprobación es una búsqueda en memoria sin bloqueos.
+# Se marca como desactualizada cuando se escribe en alguna de las tres tablas.
+class PermissionMatrix:
+
+    def __init__(self, ttl: float = PERMISSIONS_TTL):
+        self.ttl = ttl
+        self._masks = None
+        self._stale = True
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_):
+        self._stale = True
+
+    @property
+    def loaded(self) -> bool:
+        return self._masks is not None
+
+    def needs_load(self) -> bool:
+        return self._stale or self._masks is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self):
+        with self._lock:
+            # Otro hilo pudo recargarla mientras se esperaba el bloqueo
+            if not self.needs_load():
+                return
+            # Una invalidación durante la carga vuelve a marcar la matriz como desactualizada
+            self._stale = False
+            try:
+                with db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT pr.id_rol, m.nombre_modulo, pr.puede_leer, pr.puede_escribir, pr.puede_editar
+                        FROM permisos_roles pr
+                        JOIN roles r ON r.id_rol = pr.id_rol AND r.estado = 'Activo'
+                        JOIN modulos m ON m.id_modulo = pr.id_modulo AND m.estado = 'Activo'
+                        WHERE pr.estado = 'Activo'
+                    """)
+                    rows = cursor.fetchall()
+            except Exception:
+                self._stale = True
+                raise
+
+            masks = {}
+            for id_rol, module, read, write, edit in rows:
+                role = masks.setdefault(id_rol, {})
+                role[module] = role.get(module, 0) | (LEER if read else 0) | (ESCRIBIR if write else 0) | (EDITAR if edit else 0)
+            self._masks = masks
+            self._loaded_at = time.monotonic()
+
+    def mask(self, id_rol: int, module: str) -> int:
+        return (self._masks or _EMPTY).get(id_rol, _EMPTY).get(module, 0)
+
+    def allows(self, id_rol: int, module: str, bits: int) -> bool:
+        return self.mask(id_rol, module) & bits == bits
+
+    # Permisos de un rol por módulo, como nombres
+    def describe(self, id_rol: int) -> dict:
+        names = (("leer", LEER), ("escribir", ESCRIBIR), ("editar", EDITAR))
+        return {
+            module: [name for name, bit in names if mask & bit]
+            for module, mask in (self._masks or _EMPTY).get(id_rol, _EMPTY).items()
+        }
+
+
+permission_matrix = PermissionMatrix()
+for _table in ("roles", "modulos", "permisos_roles"):
+    subscribe(_table, permission_matrix.invalidate)
+
+
+# Recarga la matriz si está desactualizada. Si falla y ya había una cargada,
+# se sigue usando la anterior.
+async def ensure_permissions():
+    if not permission_matrix.needs_load():
+        return
+    try:
+        await run_db(permission_matrix.load)
+    except Exception as e:
+        if not permission_matrix.loaded:
+            raise HTTPException(status_code=503, detail=f"No se pudieron cargar los permisos: {e}")
+        print(f"No se pudo recargar la matriz de permisos: {e}")
+
+
+# Dependencia que exige los bits de permiso indicados sobre un módulo.
+# El rol viaja en el token (claim "rol"); con owner_param, el usuario dueño del
+# recurso (ese parámetro de la ruta igual a su id) no necesita el permiso.
+def require_permission(module: str, bits: int, owner_param: str = None):
+
+    async def check(request: Request, token_data: TokenData = Depends(verify_token)) -> TokenData:
+        if owner_param is not None and str(token_data.user_id) == request.path_params.get(owner_param):
+            return token_data
+        if token_data.id_rol is None:
+            # Token emitido antes de incluir el rol: se renueva con /token/refresh
+            raise HTTPException(status_code=401, detail="Token sin rol, renueve la sesión")
+        await ensure_permissions()
+        if not permission_matrix.allows(token_data.id_rol, module, bits):
+            raise HTTPException(status_code=403, detail=f"Sin permiso sobre el módulo {module}")
+        return token_data
+
+    return check
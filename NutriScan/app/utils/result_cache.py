@@ -0,0 +1,135 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# Configuración de la caché de resultados de IA
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "512"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "3600"))
+# Hash perceptual para fotos casi idénticas (recomprimidas, redimensionadas)
+AI_CACHE_PHASH = os.getenv("AI_CACHE_PHASH", "1") == "1"
+AI_CACHE_PHASH_DISTANCE = int(os.getenv("AI_CACHE_PHASH_DISTANCE", "4"))
+
+
+# Hash de diferencias (dHash) de 64 bits sobre una versión 9x8 en grises
+def dhash(image_bytes: bytes):
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if img is None:
+        return None
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# Clave de una imagen: SHA-256 exacto y, si se calcula, su dHash
+class CacheKey:
+
+    def __init__(self, task: str, version: str, digest: str):
+        self.task = task
+        self.version = version
+        self.digest = digest
+        self.phash = None
+
+
+# Caché LRU con TTL de resultados de detección, indexada por contenido.
+# Las entradas llevan la versión del modelo: al cambiar de versión se vacía.
+class ResultCache:
+
+    def __init__(self, max_entries: int = AI_CACHE_MAX_ENTRIES, ttl: float = AI_CACHE_TTL,
+                 use_phash: bool = AI_CACHE_PHASH, max_distance: int = AI_CACHE_PHASH_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_phash = use_phash
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _near_match(self, task: str, phash: int, now: float):
+        best, best_distance = None, self.max_distance + 1
+        for (entry_task, _), entry in self._entries.items():
+            if entry_task != task or entry["phash"] is None or entry["expires"] < now:
+                continue
+            distance = hamming(phash, entry["phash"])
+            if distance < best_distance:
+                best, best_distance = entry, distance
+        return best
+
+    # Busca el resultado de una imagen. Devuelve (resultado o None, clave para store)
+    def lookup(self, task: str, version: str, image_bytes: bytes):
+        key = CacheKey(task, version, hashlib.sha256(image_bytes).hexdigest())
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get((task, key.digest))
+            if entry is not None:
+                if entry["expires"] >= now:
+                    self._entries.move_to_end((task, key.digest))
+                    self._stats["exact_hits"] += 1
+                    return entry["value"], key
+                del self._entries[(task, key.digest)]
+                self._stats["expirations"] += 1
+
+        if self.use_phash:
+            key.phash = dhash(image_bytes)
+            if key.phash is not None:
+                with self._lock:
+                    entry = self._near_match(task, key.phash, now)
+                    if entry is not None:
+                        self._stats["near_hits"] += 1
+                        return entry["value"], key
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None, key
+
+    def store(self, key: CacheKey, value):
+        with self._lock:
+            self._check_version(key.version)
+            self._entries[(key.task, key.digest)] = {
+                "value": value,
+                "phash": key.phash,
+                "expires": time.monotonic() + self.ttl,
+            }
+            self._entries.move_to_end((key.task, key.digest))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["near_hits"]
+            total = hits + self._stats["misses"]
+            return {
+                "entradas": len(self._entries),
+                "max_entradas": self.max_entries,
+                "ttl_s": self.ttl,
+                "version_modelo": self._version,
+                "aciertos_exactos": self._stats["exact_hits"],
+                "aciertos_similares": self._stats["near_hits"],
+                "fallos": self._stats["misses"],
+                "desalojos": self._stats["evictions"],
+                "expiraciones": self._stats["expirations"],
+                "tasa_aciertos": hits / total if total else 0.0,
+            }
+
+
+result_cache = ResultCache()
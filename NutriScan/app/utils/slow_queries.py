@@ -0,0 +1,219 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Consultas que tardan al menos este umbral (ms) se registran; 0 lo desactiva
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Archivo rotativo del registro (en Vercel solo se puede escribir en /tmp)
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "/tmp/nutriscan_slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "3"))
+# Fracción de consultas lentas (solo SELECT) de las que se captura
+# EXPLAIN (ANALYZE, BUFFERS); ANALYZE vuelve a ejecutar la consulta
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0"))
+# Segundos mínimos entre dos EXPLAIN de la misma consulta, y su tiempo máximo
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+# Caracteres del texto SQL que se guardan
+SLOW_QUERY_TEXT_MAX = int(os.getenv("SLOW_QUERY_TEXT_MAX", "2000"))
+
+# Funciones de solo lectura que pueden aparecer en una consulta explicada. Un
+# SELECT que llama a cualquier otra (p. ej. recalcular_resumen_consumo, que
+# escribe y bloquea tablas) no se vuelve a ejecutar con EXPLAIN ANALYZE.
+EXPLAIN_SAFE_FUNCTIONS = {
+    "count", "sum", "avg", "min", "max", "round", "coalesce", "nullif", "greatest", "least",
+    "lower", "upper", "trim", "length", "substring", "concat", "date_trunc", "extract",
+    "to_char", "jsonb_agg", "json_agg", "jsonb_build_object", "json_build_object", "array_agg",
+    "string_agg", "abs", "cast",
+} | {f.strip().lower() for f in os.getenv("SLOW_QUERY_EXPLAIN_FUNCTIONS", "").split(",") if f.strip()}
+# Palabras de SQL que pueden ir seguidas de paréntesis sin ser llamadas a funciones
+_SQL_KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "any", "all", "exists", "as", "on", "join",
+    "using", "values", "over", "filter", "array", "row", "between", "is", "case", "when", "then",
+    "else", "by", "distinct", "limit", "offset", "union", "with",
+}
+_CALL = re.compile(r"\b([a-z_][a-z0-9_.]*)\s*\(")
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_ROW_LOCK = re.compile(r"\bfor\s+(?:no\s+key\s+)?(?:update|share|key\s+share)\b")
+
+
+# Solo consultas de lectura pura: SELECT sin bloqueos de filas y sin llamadas
+# a funciones fuera de EXPLAIN_SAFE_FUNCTIONS
+def explainable(query: str) -> bool:
+    sql = _LITERAL.sub("''", query).lower()
+    if not sql.lstrip().startswith("select") or _ROW_LOCK.search(sql):
+        return False
+    return all(name in EXPLAIN_SAFE_FUNCTIONS or name in _SQL_KEYWORDS for name in _CALL.findall(sql))
+
+
+# Tipos de los parámetros (nunca sus valores, que pueden ser datos personales)
+def params_shape(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: params_shape(value) if isinstance(value, (list, tuple, dict)) else type(value).__name__
+                for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        if len(params) > 20:
+            return f"{type(params).__name__}[{len(params)}]"
+        return [params_shape(value) if isinstance(value, (list, tuple, dict)) else type(value).__name__
+                for value in params]
+    return type(params).__name__
+
+
+# Texto SQL en una línea. Las altas de execute_values llegan con los valores
+# ya incluidos: se corta antes de VALUES.
+def statement_text(query) -> str:
+    if isinstance(query, bytes):
+        text = query[:SLOW_QUERY_TEXT_MAX * 2].decode(errors="replace")
+        head, sep, _ = text.partition(" VALUES ")
+        text = head + (" VALUES …" if sep else "")
+    else:
+        text = str(query)
+    return " ".join(text.split())[:SLOW_QUERY_TEXT_MAX]
+
+
+# Registro de consultas lentas: cada una se escribe como una línea JSON en un
+# archivo rotativo y queda en memoria (las últimas) para /health/slow-queries.
+# Los EXPLAIN se ejecutan en un hilo aparte con su propia conexión (fuera del
+# pool), dentro de una transacción que se revierte.
+class SlowQueryLog:
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, path: str = SLOW_QUERY_LOG_PATH,
+                 explain_sample: float = SLOW_QUERY_EXPLAIN_SAMPLE, recent: int = 100):
+        self.enabled = threshold_ms > 0
+        self.threshold = threshold_ms / 1000 if self.enabled else float("inf")
+        self.explain_sample = explain_sample
+        self.path = path
+        self._recent = deque(maxlen=recent)
+        self._logger = None
+        self._explained_at = {}
+        self._queue = queue.Queue(maxsize=10)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"slow": 0, "explains": 0, "explains_dropped": 0}
+
+    def _get_logger(self):
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    logger = logging.getLogger("nutriscan.slow_queries")
+                    logger.setLevel(logging.INFO)
+                    logger.propagate = False
+                    try:
+                        handler = logging.handlers.RotatingFileHandler(
+                            self.path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+                        )
+                        handler.setFormatter(logging.Formatter("%(message)s"))
+                        logger.addHandler(handler)
+                    except OSError as e:
+                        print(f"No se pudo abrir el registro de consultas lentas {self.path}: {e}")
+                    self._logger = logger
+        return self._logger
+
+    def _write(self, entry: dict):
+        self._recent.append(entry)
+        self._get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    # Se llama desde el cursor tras una consulta que superó el umbral.
+    # sql/name: texto registrado de una sentencia preparada (EXECUTE nombre).
+    # error: la consulta falló (p. ej. statement_timeout); se marca y no se explica.
+    def record(self, cursor, query, params, elapsed: float, labels: tuple, sql: str = None, name: str = None,
+               error: str = None):
+        text = statement_text(sql or query)
+        entry = {
+            "tipo": "lenta",
+            "fecha": datetime.now().isoformat(timespec="milliseconds"),
+            "duracion_ms": round(elapsed * 1000, 2),
+            "operacion": labels[0],
+            "tabla": labels[1],
+            "filas": cursor.rowcount,
+            "consulta": text,
+            "parametros": params_shape(params),
+        }
+        if name:
+            entry["sentencia"] = name
+        if error:
+            entry["error"] = error
+        self._stats["slow"] += 1
+        self._write(entry)
+
+        # Solo SELECT correctos: EXPLAIN ANALYZE ejecuta la sentencia y no debe
+        # repetir escrituras ni volver a lanzar una consulta que ya falló
+        # (explainable() descarta además bloqueos y funciones que no son de lectura)
+        if error or labels[0] != "SELECT":
+            return
+        if self.explain_sample > 0 and random.random() < self.explain_sample:
+            self._schedule_explain(sql or query, params, text)
+
+    def _schedule_explain(self, query, params, text: str):
+        if not isinstance(query, str) or not explainable(query):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(text, -SLOW_QUERY_EXPLAIN_INTERVAL) < SLOW_QUERY_EXPLAIN_INTERVAL:
+                return
+            self._explained_at[text] = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="slow-query-explain", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((query, params, text))
+        except queue.Full:
+            self._stats["explains_dropped"] += 1
+
+    def _worker(self):
+        # Importación diferida: db_config usa este módulo
+        import psycopg2
+        import psycopg2.extensions
+        from app.config.db_config import get_db_connection
+
+        conn = None
+        while True:
+            query, params, text = self._queue.get()
+            try:
+                if conn is None or conn.closed:
+                    conn = get_db_connection()
+                # Cursor sin medir para que el EXPLAIN no se registre a sí mismo
+                cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+                cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+                plan = cursor.fetchone()[0]
+                conn.rollback()
+                self._stats["explains"] += 1
+                self._write({
+                    "tipo": "explain",
+                    "fecha": datetime.now().isoformat(timespec="milliseconds"),
+                    "consulta": text,
+                    "plan": plan,
+                })
+            except Exception as e:
+                print(f"No se pudo obtener EXPLAIN de una consulta lenta: {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    conn = None
+
+    def recent(self, limit: int = 50) -> list:
+        return list(self._recent)[-limit:][::-1]
+
+    def stats(self) -> dict:
+        return {
+            "umbral_ms": self.threshold * 1000 if self.enabled else None,
+            "archivo": self.path,
+            "muestreo_explain": self.explain_sample,
+            "lentas": self._stats["slow"],
+            "explains": self._stats["explains"],
+            "explains_descartados": self._stats["explains_dropped"],
+        }
+
+
+slow_query_log = SlowQueryLog()
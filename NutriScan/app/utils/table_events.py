@@ -0,0 +1,19 @@
+# Notificaciones en proceso de cambios en tablas.
+# Los controladores avisan tras confirmar (commit) una escritura y las cachés
+# en memoria que dependen de esa tabla se invalidan o actualizan.
+
+_listeners = {}
+
+
+# Registra listener(action, row) para los cambios de una tabla
+def subscribe(table: str, listener):
+    _listeners.setdefault(table, []).append(listener)
+
+
+# action: "create", "update", "deactivate" o "bulk"; row: fila afectada (o su llave, o None)
+def notify_change(table: str, action: str, row: dict = None):
+    for listener in _listeners.get(table, []):
+        try:
+            listener(action, row)
+        except Exception as e:
+            print(f"Error al notificar cambio en {table}: {e}")
@@ -0,0 +1,86 @@
+import threading
+import time
+from datetime import datetime, timezone
+import psycopg2
+from app.config.db_config import db_connection
+
+
+# Lista de tokens revocados (logout y tokens de refresco ya rotados).
+# En memoria se guarda jti -> exp para consultas O(1) en cada petición;
+# la tabla tokens_revocados (sql/tokens_revocados.sql) la comparten todas
+# las instancias de la API y se carga al arrancar. Las entradas se purgan
+# cuando el token habría caducado de todos modos.
+class TokenRevocationList:
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+    def load(self):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM tokens_revocados WHERE expira < NOW() AT TIME ZONE 'UTC'")
+            cursor.execute("SELECT jti, expira FROM tokens_revocados")
+            rows = cursor.fetchall()
+            conn.commit()
+
+        with self._lock:
+            for jti, expira in rows:
+                self._revoked[jti] = expira.replace(tzinfo=timezone.utc).timestamp()
+        return len(rows)
+
+    # Devuelve False si el token ya estaba revocado (p. ej. un refresco reutilizado).
+    # Si no se puede guardar en la BD se propaga el error (la API responde 503)
+    def revoke(self, jti: str, user_id: int, exp: float) -> bool:
+        with self._lock:
+            self._purge(time.time())
+            if jti in self._revoked:
+                return False
+            self._revoked[jti] = exp
+
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO tokens_revocados (jti, id_usuario, expira) VALUES (%s, %s, %s) ON CONFLICT (jti) DO NOTHING",
+                    (jti, user_id, datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None))
+                )
+                conn.commit()
+                # Otra instancia lo revocó primero
+                return cursor.rowcount == 1
+        except psycopg2.Error as e:
+            # Se deshace en memoria para que el cliente pueda reintentar con el mismo token
+            print(f"No se pudo guardar el token revocado {jti}: {e}")
+            with self._lock:
+                self._revoked.pop(jti, None)
+            raise
+
+    # check_db consulta además la tabla (por llave primaria) si no está en memoria.
+    # Si la BD no responde se propaga el error: un token de refresco no se acepta sin comprobarlo
+    def is_revoked(self, jti: str, check_db: bool = False) -> bool:
+        if jti is None:
+            return False
+        with self._lock:
+            if jti in self._revoked:
+                return True
+        if not check_db:
+            return False
+
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT expira FROM tokens_revocados WHERE jti = %s", (jti,))
+            row = cursor.fetchone()
+
+        if row is None:
+            return False
+        with self._lock:
+            self._revoked[jti] = row[0].replace(tzinfo=timezone.utc).timestamp()
+        return True
+
+
+token_revocations = TokenRevocationList()
@@ -0,0 +1,96 @@
+"""
+Benchmark del coste de autenticación por petición.
+
+Compara la verificación del token sin caché (jwt.decode + TokenData en cada
+llamada, como antes) contra decode_token con la caché LRU de tokens, y mide
+el sobrecoste de Depends(verify_token) y de require_permission (matriz RBAC en
+memoria) en una petición ASGI completa frente a una ruta sin autenticación.
+
+Uso:
+    python benchmarks/bench_auth_overhead.py --runs 20000 --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from app.utils.auth import (  # noqa: E402
+    ALGORITHM, SECRET_KEY, TokenData, create_access_token, decode_token, token_cache, verify_token
+)
+from app.utils.permissions import LEER, permission_matrix, require_permission  # noqa: E402
+
+
+# Referencia: decodificar y validar el token en cada petición
+def decode_uncached(token):
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return TokenData(user_id=int(payload["sub"]), email=payload["email"])
+
+
+def per_call_us(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de autenticación JWT")
+    parser.add_argument("--runs", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "1", "email": "bench@app.com", "rol": 1}, timedelta(minutes=30))
+    # Matriz sintética ya cargada: el benchmark no necesita base de datos
+    permission_matrix._masks = {1: {"Usuarios": 7}}
+    permission_matrix._stale = False
+    permission_matrix._loaded_at = time.monotonic()
+    permission_matrix.ttl = float("inf")
+
+    token_cache.clear()
+    uncached = per_call_us(lambda: decode_uncached(token), args.runs)
+    cached = per_call_us(lambda: decode_token(token), args.runs)
+    print(f"{'verificación':<28} {'µs/llamada':>12}")
+    print(f"{'jwt.decode sin caché':<28} {uncached:>12.2f}")
+    print(f"{'decode_token con caché':<28} {cached:>12.2f}")
+
+    app = FastAPI()
+
+    @app.get("/open")
+    async def open_route():
+        return {"ok": True}
+
+    @app.get("/auth", dependencies=[Depends(verify_token)])
+    async def auth_route():
+        return {"ok": True}
+
+    @app.get("/rbac", dependencies=[Depends(require_permission("Usuarios", LEER))])
+    async def rbac_route():
+        return {"ok": True}
+
+    headers = {"Authorization": f"Bearer {token}"}
+    with TestClient(app) as client:
+        results = {}
+        # Calentamiento de ambas rutas antes de medir
+        for _ in range(200):
+            client.get("/open", headers=headers)
+            client.get("/auth", headers=headers)
+            client.get("/rbac", headers=headers)
+        for path in ("/open", "/auth", "/rbac"):
+            results[path] = per_call_us(lambda: client.get(path, headers=headers), args.requests)
+
+    print(f"\n{'petición ASGI':<28} {'µs/petición':>12}")
+    print(f"{'sin autenticación':<28} {results['/open']:>12.1f}")
+    print(f"{'Depends(verify_token)':<28} {results['/auth']:>12.1f}")
+    print(f"{'require_permission':<28} {results['/rbac']:>12.1f}")
+    print(f"{'sobrecoste token':<28} {results['/auth'] - results['/open']:>12.1f}")
+    print(f"{'sobrecoste permisos':<28} {results['/rbac'] - results['/auth']:>12.1f}")
+    print(f"\nCaché de tokens: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
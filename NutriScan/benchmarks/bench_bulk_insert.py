@@ -0,0 +1,71 @@
+"""
+Benchmark de alta masiva en registro_consumo.
+
+Compara insertar N filas una por una con Registro_consumoController.create
+(una transacción por fila, como hacían los clientes con un POST por fila)
+contra bulk_insert (execute_values en una sola transacción). Las filas
+insertadas se borran al terminar.
+
+Requiere la base de datos configurada (DATABASE_URL o DB_*).
+
+Uso:
+    python benchmarks/bench_bulk_insert.py --rows 10000 --user-id 1 --food-id 1
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.config.db_config import close_db_pool, db_connection  # noqa: E402
+from app.controllers.registro_consumo_controller import Registro_consumoController  # noqa: E402
+from app.utils.bulk import bulk_insert  # noqa: E402
+
+
+def make_rows(n, user_id, food_id):
+    return [
+        {"id_usuario": user_id, "id_alimento": food_id, "cantidad_gramos": 50 + i % 200}
+        for i in range(n)
+    ]
+
+
+def cleanup(ids):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM registro_consumo WHERE id_registro = ANY(%s)", (ids,))
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de alta masiva")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--food-id", type=int, default=1)
+    parser.add_argument("--skip-single", action="store_true", help="no medir la inserción fila por fila")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.user_id, args.food_id)
+    print(f"{'método':<22} {'filas':>7} {'segundos':>9} {'filas/s':>10}")
+
+    try:
+        if not args.skip_single:
+            controller = Registro_consumoController()
+            ids = []
+            start = time.perf_counter()
+            for row in rows:
+                ids.append(controller.create(dict(row))["data"]["id_registro"])
+            elapsed = time.perf_counter() - start
+            cleanup(ids)
+            print(f"{'create por fila':<22} {len(rows):>7} {elapsed:>9.2f} {len(rows) / elapsed:>10.0f}")
+
+        start = time.perf_counter()
+        result = bulk_insert("registro_consumo", rows)
+        elapsed = time.perf_counter() - start
+        cleanup([i for i in result["ids"] if i is not None])
+        print(f"{'bulk_insert':<22} {len(rows):>7} {elapsed:>9.2f} {len(rows) / elapsed:>10.0f}")
+    finally:
+        close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark de carga para las rutas CRUD.
+
+Lanza N clientes concurrentes contra un endpoint de la API y reporta
+peticiones por segundo y latencias. Ejecutarlo una vez contra la versión
+anterior (rutas que llaman al controlador directamente) y otra contra la
+actual (rutas que esperan run_db) para comparar.
+
+Uso:
+    python benchmarks/bench_crud_concurrency.py --url http://localhost:8000 \
+        --path /alimentos/ --token <JWT> --concurrency 50 100 200 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _client(client, url, headers, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def run_level(base_url, path, token, concurrency, duration):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], []
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            _client(client, path, headers, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+
+    ok = len(latencies)
+    latencies.sort()
+    return {
+        "concurrencia": concurrency,
+        "req_s": ok / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if ok else 0.0,
+        "p99_ms": latencies[int(ok * 0.99) - 1] * 1000 if ok else 0.0,
+        "errores": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de rutas CRUD")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/alimentos/")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 200, 500])
+    args = parser.parse_args()
+
+    print(f"{'clientes':>9} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errores':>8}")
+    for level in args.concurrency:
+        r = asyncio.run(run_level(args.url, args.path, args.token, level, args.duration))
+        print(f"{r['concurrencia']:>9} {r['req_s']:>10.1f} {r['p50_ms']:>10.1f} {r['p99_ms']:>10.1f} {r['errores']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark de micro-batching de inferencia ONNX en CPU.
+
+Compara el rendimiento (imágenes/s) de llamar session.run imagen por imagen
+contra InferenceBatcher con varios tamaños de lote, usando N hilos clientes
+concurrentes y tensores aleatorios de 1x3x640x640.
+
+El modelo debe exportarse con eje de lote dinámico para agrupar peticiones
+(p. ej. `yolo export model=yolov8n.pt format=onnx dynamic=True`); con lote fijo
+el batcher se limita a 1 y ambos modos rinden igual.
+
+Sin un modelo exportado con lote dinámico, --synthetic genera (con el paquete
+onnx) una red convolucional con entrada [N, 3, 640, 640] y salida
+[N, 84, 6400], parecida en forma a YOLOv8n pero con ~1/8 de su cómputo.
+
+Uso:
+    python benchmarks/bench_inference_batching.py --model /tmp/yolov8n.onnx \
+        --clients 8 --images 256 --batch 1 4 8 16
+    python benchmarks/bench_inference_batching.py --synthetic --images 64
+
+Resultado de referencia (--synthetic, 8 clientes, 128 imágenes, 1 vCPU,
+onnxruntime 1.31, dos ejecuciones), en img/s:
+    directo 67-71 | lote 1 81-85 | lote 2 74-81 | lote 4 71-82 | lote 8 65-68
+Con un solo núcleo lo que mejora el rendimiento es serializar session.run en
+el hilo del batcher (lote 1, sin hilos compitiendo); los lotes mayores no
+aportan. Con varios núcleos conviene repetir la medición antes de elegir
+AI_MAX_BATCH. El yolov8n.onnx publicado es de lote fijo 1: con él el batcher se
+limita a 1.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import onnxruntime as ort
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.utils.inference_batcher import InferenceBatcher  # noqa: E402
+
+
+def run_clients(fn, tensors, clients):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(fn, tensors))
+    return len(tensors) / (time.perf_counter() - start)
+
+
+# Red convolucional con eje de lote dinámico ("batch") guardada en path
+def build_synthetic_model(path: str):
+    try:
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+    except ImportError:
+        sys.exit("--synthetic requiere el paquete onnx (pip install onnx)")
+
+    rng = np.random.default_rng(0)
+    layers = [(3, 16, 3, 2), (16, 32, 3, 2), (32, 64, 3, 2), (64, 64, 3, 1), (64, 84, 1, 1)]
+    nodes, weights = [], []
+    current = "images"
+    for i, (cin, cout, kernel, stride) in enumerate(layers):
+        weight = (rng.standard_normal((cout, cin, kernel, kernel)) * 0.1).astype(np.float32)
+        weights.append(numpy_helper.from_array(weight, f"w{i}"))
+        pad = kernel // 2
+        nodes.append(helper.make_node("Conv", [current, f"w{i}"], [f"conv{i}"],
+                                      strides=[stride, stride], pads=[pad] * 4))
+        nodes.append(helper.make_node("Relu", [f"conv{i}"], [f"relu{i}"]))
+        current = f"relu{i}"
+    # [N, 84, 80, 80] -> [N, 84, 6400], como la salida de YOLOv8 ([N, 84, anclas])
+    weights.append(numpy_helper.from_array(np.array([0, 84, -1], dtype=np.int64), "shape"))
+    nodes.append(helper.make_node("Reshape", [current, "shape"], ["output0"]))
+
+    graph = helper.make_graph(
+        nodes, "synthetic_detector",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, 640, 640])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 84, 6400])],
+        initializer=weights
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    # IR 8 (opset 17): lo cargan también versiones anteriores de onnxruntime
+    model.ir_version = 8
+    onnx.save(model, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de micro-batching ONNX")
+    parser.add_argument("--model", default="/tmp/yolov8n.onnx")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--images", type=int, default=128)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    parser.add_argument("--synthetic", action="store_true", help="Usar un modelo sintético con lote dinámico")
+    args = parser.parse_args()
+
+    model = build_synthetic_model("/tmp/bench_synthetic_dynamic.onnx") if args.synthetic else args.model
+    session = ort.InferenceSession(model, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    tensors = [np.random.rand(1, 3, 640, 640).astype(np.float32) for _ in range(args.images)]
+
+    # Calentamiento
+    session.run(None, {input_name: tensors[0]})
+
+    direct = run_clients(lambda t: session.run(None, {input_name: t}), tensors, args.clients)
+    print(f"{'modo':>12} {'img/s':>10} {'lote prom.':>11}")
+    print(f"{'directo':>12} {direct:>10.1f} {1.0:>11.1f}")
+
+    for max_batch in args.batch:
+        batcher = InferenceBatcher(session, input_name, max_batch=max_batch, max_wait_ms=args.wait_ms)
+        throughput = run_clients(batcher.infer, tensors, args.clients)
+        stats = batcher.stats()
+        print(f"{'lote ' + str(batcher.max_batch):>12} {throughput:>10.1f} {stats['lote_promedio']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de rendimiento de /login.
+
+Lanza N clientes concurrentes haciendo login con credenciales válidas y,
+en paralelo, un cliente que consulta una ruta ligera (por defecto "/")
+para medir cuánto afecta una ráfaga de logins al resto de la API.
+Las respuestas 429 (límite de concurrencia de bcrypt) se cuentan aparte.
+
+Uso:
+    python benchmarks/bench_login_throughput.py --url http://localhost:8000 \
+        --email juan.admin@app.com --password hash_admin_1 --concurrency 10 50 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _login_client(client, payload, deadline, latencies, rejected, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post("/login", json=payload)
+            if response.status_code == 429:
+                rejected.append(response.status_code)
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+            elif response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def _probe_client(client, path, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            await client.get(path)
+            latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.05)
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return 0.0, 0.0
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000
+
+
+async def run_level(base_url, payload, probe_path, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    latencies, rejected, errors, probe = [], [], [], []
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            _probe_client(client, probe_path, deadline, probe),
+            *[_login_client(client, payload, deadline, latencies, rejected, errors) for _ in range(concurrency)]
+        )
+
+    p50, p99 = _percentiles(latencies)
+    probe_p50, probe_p99 = _percentiles(probe)
+    return {
+        "concurrencia": concurrency,
+        "logins_s": len(latencies) / duration,
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "rechazos_429": len(rejected),
+        "errores": len(errors),
+        "sonda_p50_ms": probe_p50,
+        "sonda_p99_ms": probe_p99,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de rendimiento de /login")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--probe", default="/")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100])
+    args = parser.parse_args()
+
+    payload = {"email": args.email, "password": args.password}
+    print(f"{'clientes':>9} {'logins/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'429':>6} {'errores':>8} "
+          f"{'sonda p50':>10} {'sonda p99':>10}")
+    for level in args.concurrency:
+        r = asyncio.run(run_level(args.url, payload, args.probe, level, args.duration))
+        print(f"{r['concurrencia']:>9} {r['logins_s']:>9.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['rechazos_429']:>6} {r['errores']:>8} {r['sonda_p50_ms']:>10.1f} {r['sonda_p99_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
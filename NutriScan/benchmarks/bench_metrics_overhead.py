@@ -0,0 +1,102 @@
+"""
+Benchmark del sobrecoste de la instrumentación de /metrics.
+
+Mide, sin cliente HTTP de por medio (llamando a la app ASGI directamente),
+una ruta FastAPI con y sin MetricsMiddleware, y el coste de TimedCursor
+frente a un cursor normal ejecutando la misma consulta en la misma conexión.
+
+Uso:
+    python benchmarks/bench_metrics_overhead.py --requests 20000 --queries 5000 [--skip-db]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import psycopg2.extensions  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from app.config.db_config import TimedCursor, close_db_pool, db_connection  # noqa: E402
+from app.utils.metrics import MetricsMiddleware, http_request_duration  # noqa: E402
+
+
+def build_app(instrumented: bool):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id, "nombre": "Manzana", "calorias": 52}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def request_us(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/items/7", "raw_path": b"/items/7", "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "server": ("bench", 80), "client": ("127.0.0.1", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Calentamiento (arranque perezoso de la pila de middlewares)
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def query_us(cursor, queries: int) -> float:
+    for _ in range(100):
+        cursor.execute("SELECT id_alimento, nombre FROM alimentos WHERE id_alimento = %s", (1,))
+        cursor.fetchall()
+    start = time.perf_counter()
+    for _ in range(queries):
+        cursor.execute("SELECT id_alimento, nombre FROM alimentos WHERE id_alimento = %s", (1,))
+        cursor.fetchall()
+    return (time.perf_counter() - start) / queries * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de sobrecoste de métricas")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--skip-db", action="store_true", help="no medir el cursor (sin base de datos)")
+    args = parser.parse_args()
+
+    plain = asyncio.run(request_us(build_app(False), args.requests))
+    instrumented = asyncio.run(request_us(build_app(True), args.requests))
+    print(f"{'medición':<28} {'µs':>9} {'sobrecoste':>11}")
+    print(f"{'petición sin middleware':<28} {plain:>9.1f}")
+    print(f"{'petición con middleware':<28} {instrumented:>9.1f} {(instrumented / plain - 1) * 100:>10.1f}%")
+
+    runs = 200000
+    start = time.perf_counter()
+    for _ in range(runs):
+        http_request_duration.observe(0.004, "GET", "/items/{item_id}")
+    print(f"{'Histogram.observe':<28} {(time.perf_counter() - start) / runs * 1e6:>9.2f}")
+
+    if args.skip_db:
+        return
+    try:
+        with db_connection() as conn:
+            plain = query_us(conn.cursor(cursor_factory=psycopg2.extensions.cursor), args.queries)
+            timed = query_us(conn.cursor(cursor_factory=TimedCursor), args.queries)
+            conn.rollback()
+        print(f"{'consulta con cursor normal':<28} {plain:>9.1f}")
+        print(f"{'consulta con TimedCursor':<28} {timed:>9.1f} {(timed / plain - 1) * 100:>10.1f}%")
+    finally:
+        close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de sentencias preparadas del lado del servidor.
+
+Mide la latencia por consulta de las consultas más frecuentes (búsqueda de
+alimento por id, usuario del login y listado de usuarios con sus joins)
+ejecutándolas con SQL plano y con PREPARE/EXECUTE sobre la misma conexión.
+
+Requiere la base de datos configurada (DATABASE_URL o DB_*).
+
+Uso:
+    python benchmarks/bench_prepared_statements.py --iterations 5000 --email juan.admin@app.com
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.config.db_config import close_db_pool, db_connection  # noqa: E402
+from app.config.prepared_statements import PreparedStatements  # noqa: E402
+from app.controllers.user_controller import USER_FIELDS, USER_JOINS  # noqa: E402
+
+USERS_QUERY = f"""
+    SELECT DISTINCT ON (u.id_usuario)
+        {", ".join(USER_FIELDS.values())}
+    FROM usuarios u
+    {" ".join(USER_JOINS.values())}
+    WHERE u.estado = 'Activo' AND u.id_usuario > %s
+    ORDER BY u.id_usuario
+    LIMIT %s
+"""
+
+QUERIES = {
+    "alimento por id": ("SELECT * FROM alimentos WHERE id_alimento = %s", lambda i, a: (1 + i % 5,)),
+    "usuario del login": (
+        "SELECT id_usuario, email, password_hash, nombre_completo, id_rol "
+        "FROM usuarios WHERE email = %s AND estado = 'Activo'",
+        lambda i, a: (a.email,)
+    ),
+    "listado de usuarios": (USERS_QUERY, lambda i, a: (0, 51)),
+}
+
+
+def measure(cursor, statements, name, params, iterations):
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        statements.execute(cursor, name, params(i))
+        cursor.fetchall()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de sentencias preparadas")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--email", default="juan.admin@app.com")
+    args = parser.parse_args()
+
+    print(f"{'consulta':<22} {'modo':<10} {'media µs':>9} {'p99 µs':>9}")
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            for number, (label, (sql, build_params)) in enumerate(QUERIES.items()):
+                params = lambda i: build_params(i, args)  # noqa: E731
+                for mode, enabled in (("sql", False), ("preparada", True)):
+                    statements = PreparedStatements(enabled=enabled)
+                    name = statements.register(sql, f"bench_{number}")
+                    # Calentamiento: prepara la sentencia y llena cachés
+                    measure(cursor, statements, name, params, 50)
+                    mean, p99 = measure(cursor, statements, name, params, args.iterations)
+                    print(f"{label:<22} {mode:<10} {mean * 1e6:>9.0f} {p99 * 1e6:>9.0f}")
+                conn.rollback()
+    finally:
+        close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
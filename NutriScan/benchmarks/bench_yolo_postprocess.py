@@ -0,0 +1,83 @@
+"""
+Benchmark del post-proceso de YOLOv8 (decodificación + NMS) por imagen.
+
+Genera salidas sintéticas 1x84x8400 con un número configurable de anclas
+"activas" y compara decode_yolov8 (vectorizado) contra una referencia con
+bucle de Python por ancla.
+
+Uso:
+    python benchmarks/bench_yolo_postprocess.py --runs 200 --active 50 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.utils.ai_utils import AI_CONF_THRESHOLD, FOOD_LABELS, decode_yolov8, nms  # noqa: E402
+
+
+def synthetic_output(active, rng):
+    output = np.zeros((1, 84, 8400), dtype=np.float32)
+    output[0, 4:] = rng.random((80, 8400), dtype=np.float32) * 0.1
+    idx = rng.choice(8400, size=active, replace=False)
+    cls = rng.choice(list(FOOD_LABELS), size=active)
+    output[0, 0, idx] = rng.uniform(50, 590, active)
+    output[0, 1, idx] = rng.uniform(50, 590, active)
+    output[0, 2, idx] = rng.uniform(20, 200, active)
+    output[0, 3, idx] = rng.uniform(20, 200, active)
+    output[0, 4 + cls, idx] = rng.uniform(0.3, 0.99, active)
+    return output
+
+
+# Referencia: recorrido ancla por ancla como se haría sin NumPy vectorizado
+def loop_decode(output, meta):
+    pad_x, pad_y = meta["pad"]
+    scale = meta["scale"]
+    boxes, scores, classes = [], [], []
+    preds = output[0]
+    for a in range(preds.shape[1]):
+        best_cls, best_score = None, AI_CONF_THRESHOLD
+        for cls in FOOD_LABELS:
+            if preds[4 + cls, a] > best_score:
+                best_cls, best_score = cls, preds[4 + cls, a]
+        if best_cls is None:
+            continue
+        cx, cy, w, h = preds[:4, a]
+        cx, cy = cx - pad_x, cy - pad_y
+        boxes.append([(cx - w / 2) / scale, (cy - h / 2) / scale, (cx + w / 2) / scale, (cy + h / 2) / scale])
+        scores.append(best_score)
+        classes.append(best_cls)
+    boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+    keep = nms(boxes, np.array(scores), np.array(classes))
+    return boxes[keep]
+
+
+def timeit(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de post-proceso YOLOv8")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--active", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Imagen 1920x1080 con letterbox a 640x640
+    meta = {"shape": (1080, 1920), "scale": 640 / 1920, "pad": (0, 140)}
+    print(f"{'anclas activas':>15} {'vectorizado ms':>15} {'bucle ms':>10}")
+    for active in args.active:
+        output = synthetic_output(active, rng)
+        vec = timeit(lambda: decode_yolov8(output, meta, class_ids=FOOD_LABELS), args.runs)
+        loop = timeit(lambda: loop_decode(output, meta), max(1, args.runs // 20))
+        print(f"{active:>15} {vec:>15.3f} {loop:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
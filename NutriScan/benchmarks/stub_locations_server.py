@@ -0,0 +1,102 @@
+"""
+Servidor de prueba que imita GET /api/ubicaciones del servicio de Node.
+
+Sirve {total, data} con ciudades sintéticas y permite simular latencia y
+fallos (códigos 5xx, cierres de conexión o filas incompletas) para probar el cliente HTTP
+compartido: reutilización de conexiones, reintentos y circuit breaker.
+Cada conexión TCP nueva se registra en la salida, así se ve si el cliente
+reutiliza conexiones (keep-alive).
+
+Uso:
+    python benchmarks/stub_locations_server.py --port 3001 --cities 1000 \
+        --latency-ms 50 --fail-rate 0.2 --fail-status 503
+    NODE_SERVICE_URL=http://127.0.0.1:3001/api/ubicaciones uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def synthetic_rows(cities):
+    rows = []
+    for i in range(1, cities + 1):
+        rows.append({
+            "id_ciudad": i,
+            "pais": f"Pais {i % 3 + 1}",
+            "departamento": f"Departamento {i % 25 + 1}",
+            "ciudad": f"Ciudad {i}",
+            "estado": "Activo",
+        })
+    return rows
+
+
+def make_handler(body, latency, fail_rate, fail_status):
+    stats = {"connections": 0, "requests": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            stats["connections"] += 1
+            print(f"Conexión nueva #{stats['connections']} desde {self.client_address[0]}:{self.client_address[1]}")
+
+        def do_GET(self):
+            stats["requests"] += 1
+            if not self.path.startswith("/api/ubicaciones"):
+                self.send_error(404)
+                return
+            if latency:
+                time.sleep(latency)
+            if random.random() < fail_rate:
+                if fail_status == 0:
+                    # Cierre abrupto: el cliente ve un error de transporte
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                self.send_response(fail_status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de prueba del servicio de ubicaciones")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=503, help="0 = cerrar la conexión sin responder")
+    parser.add_argument("--malformed", action="store_true", help="Omitir el campo pais de la primera fila")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.cities)
+    if args.malformed and rows:
+        del rows[0]["pais"]
+    body = json.dumps({"total": len(rows), "data": rows}).encode("utf-8")
+    handler, stats = make_handler(body, args.latency_ms / 1000, args.fail_rate, args.fail_status)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Servidor de ubicaciones de prueba en http://127.0.0.1:{args.port}/api/ubicaciones")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Conexiones: {stats['connections']}, peticiones: {stats['requests']}")
+
+
+if __name__ == "__main__":
+    main()
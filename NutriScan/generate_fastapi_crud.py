@@ -16,196 +16,49 @@ base_dir = r"c:\Proyecto_RC\NutriScan\app"
 
 for t in tables:
     name = t["name"]
-    id_col = t["id_col"]
     
     # Model (Generic Dict representation to avoid massive boilerplate, but FastAPI accepts dicts)
     model_code = f"""
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class {name.capitalize()}Create(BaseModel):
     data: Dict[str, Any]
 
 class {name.capitalize()}Update(BaseModel):
     data: Dict[str, Any]
+
+class {name.capitalize()}Bulk(BaseModel):
+    rows: List[Dict[str, Any]]
+    # Columnas con restricción única para hacer upsert (ON CONFLICT ... DO UPDATE)
+    conflict_columns: Optional[List[str]] = None
+    # Si alguna fila falla no se guarda ninguna
+    all_or_nothing: bool = False
 """
     with open(os.path.join(base_dir, f"models/{name}_model.py"), "w", encoding="utf-8") as f:
         f.write(model_code)
         
-    # Controller
+    # Controller: subclase del motor CRUD genérico (app/controllers/crud_controller.py)
     controller_code = f"""
-import psycopg2
-from fastapi import HTTPException
-from app.config.db_config import get_db_connection
-from datetime import datetime
-
-class {name.capitalize()}Controller:
-    
-    def get_all(self):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Revisar si existe la columna de estado para filtrar
-            cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name='{name}' AND column_name='estado'")
-            has_estado = cursor.fetchone() is not None
-            
-            if has_estado:
-                cursor.execute("SELECT * FROM {name} WHERE estado != 'Inactivo' ORDER BY {id_col} ASC")
-            else:
-                cursor.execute("SELECT * FROM {name} ORDER BY {id_col} ASC")
-                
-            columns = [desc[0] for desc in cursor.description]
-            result = cursor.fetchall()
-            
-            return {{"resultado": [dict(zip(columns, row)) for row in result]}}
-        except psycopg2.Error as err:
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
+from app.controllers.crud_controller import CrudController
 
-    def get_by_id(self, item_id: int):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM {name} WHERE {id_col} = %s", (item_id,))
-            columns = [desc[0] for desc in cursor.description]
-            row = cursor.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="No encontrado")
-            return {{"resultado": dict(zip(columns, row))}}
-        except psycopg2.Error as err:
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
-            
-    def create(self, data: dict):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Aseguramos de insertar la fecha actual
-            if 'fecha_creacion' not in data:
-                data['fecha_creacion'] = datetime.now()
-            if 'fecha_actualizacion' not in data:
-                data['fecha_actualizacion'] = datetime.now()
-                
-            keys = list(data.keys())
-            values = tuple(data.values())
-            
-            placeholders = ", ".join(["%s"] * len(keys))
-            columns = ", ".join(keys)
-            
-            query = f"INSERT INTO {name} ({{columns}}) VALUES ({{placeholders}}) RETURNING *"
-            cursor.execute(query, values)
-            
-            cols = [desc[0] for desc in cursor.description]
-            new_row = cursor.fetchone()
-            
-            conn.commit()
-            return {{"resultado": "Creado con éxito", "data": dict(zip(cols, new_row))}}
-        except psycopg2.Error as err:
-            if conn: conn.rollback()
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
+class {name.capitalize()}Controller(CrudController):
 
-    def update(self, item_id: int, data: dict):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Forzar actualización de fecha
-            data['fecha_actualizacion'] = datetime.now()
-            
-            keys = list(data.keys())
-            values = list(data.values())
-            
-            set_clause = ", ".join([f"{{k}} = %s" for k in keys])
-            values.append(item_id)
-            
-            query = f"UPDATE {name} SET {{set_clause}} WHERE {id_col} = %s RETURNING *"
-            cursor.execute(query, tuple(values))
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="No encontrado")
-                
-            cols = [desc[0] for desc in cursor.description]
-            updated_row = cursor.fetchone()
-                
-            conn.commit()
-            return {{"resultado": "Actualizado con éxito", "data": dict(zip(cols, updated_row))}}
-        except psycopg2.Error as err:
-            if conn: conn.rollback()
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
-
-    def deactivate(self, item_id: int):
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Aplicar Soft Delete (Estado = 'Inactivo')
-            cursor.execute(f"UPDATE {name} SET estado = 'Inactivo', fecha_actualizacion = NOW() WHERE {id_col} = %s", (item_id,))
-                
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="No encontrado")
-                
-            conn.commit()
-            return {{"resultado": "Desactivado con éxito (Soft Delete)"}}
-        except psycopg2.Error as err:
-            if conn: conn.rollback()
-            raise HTTPException(status_code=500, detail=str(err))
-        finally:
-            if conn: conn.close()
+    def __init__(self):
+        super().__init__("{name}")
 """
     with open(os.path.join(base_dir, f"controllers/{name}_controller.py"), "w", encoding="utf-8") as f:
         f.write(controller_code)
         
-    # Route
+    # Route: router construido por app/routes/crud_routes.py
     route_code = f"""
-from fastapi import APIRouter, Request, HTTPException
 from app.controllers.{name}_controller import {name.capitalize()}Controller
-from app.models.{name}_model import {name.capitalize()}Create, {name.capitalize()}Update
-from app.utils.auth import verify_token
-
-router = APIRouter(
-    prefix="/{name}",
-    tags=["{name}"]
-)
+from app.models.{name}_model import {name.capitalize()}Create, {name.capitalize()}Update, {name.capitalize()}Bulk
+from app.routes.crud_routes import build_crud_router
 
 controller = {name.capitalize()}Controller()
 
-@router.get("/")
-async def get_all(request: Request):
-    await verify_token(request)
-    return controller.get_all()
-
-@router.get("/{{item_id}}")
-async def get_by_id(item_id: int, request: Request):
-    await verify_token(request)
-    return controller.get_by_id(item_id)
-
-@router.post("/")
-async def create(data: {name.capitalize()}Create, request: Request):
-    await verify_token(request)
-    return controller.create(data.data)
-
-@router.put("/{{item_id}}")
-async def update(item_id: int, data: {name.capitalize()}Update, request: Request):
-    await verify_token(request)
-    return controller.update(item_id, data.data)
-
-@router.delete("/{{item_id}}") # Se mantiene el método HTTP DELETE para la API, pero llama a deactivate
-async def deactivate(item_id: int, request: Request):
-    await verify_token(request)
-    return controller.deactivate(item_id)
+router = build_crud_router("{name}", controller, {name.capitalize()}Create, {name.capitalize()}Update, {name.capitalize()}Bulk)
 """
     with open(os.path.join(base_dir, f"routes/{name}_routes.py"), "w", encoding="utf-8") as f:
         f.write(route_code)
@@ -0,0 +1,31 @@
+"""
+Reconstruye resumen_consumo_diario a partir de registro_consumo.
+
+Útil tras cargas de datos hechas por fuera de la API o para reparar el
+resumen. Sin argumentos recalcula todos los usuarios y fechas.
+
+Uso:
+    python rebuild_consumption_rollups.py [--user-id 3] [--desde 2024-01-01] [--hasta 2024-12-31]
+"""
+import argparse
+from datetime import date
+from app.config.db_config import close_db_pool
+from app.controllers.resumen_consumo_controller import ResumenConsumoController
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el resumen diario de consumo")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--desde", type=date.fromisoformat)
+    parser.add_argument("--hasta", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    try:
+        result = ResumenConsumoController().rebuild(args.user_id, args.desde, args.hasta)
+        print(result["resultado"])
+    finally:
+        close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import pytest
+
+# Dependencias de las pruebas: pip install -r requirements-dev.txt
+# Ejecutar desde NutriScan con: python -m pytest -q
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Permite importar el paquete app al ejecutar pytest desde cualquier directorio
+sys.path.insert(0, ROOT)
+
+STUB_SERVER = os.path.join(ROOT, "benchmarks", "stub_locations_server.py")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, process, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("El servidor de ubicaciones de prueba terminó al arrancar")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"El servidor de ubicaciones de prueba no respondió en el puerto {port}")
+
+
+# Arranca benchmarks/stub_locations_server.py con los argumentos indicados y
+# devuelve la URL de /api/ubicaciones. Los servidores se detienen al terminar la prueba.
+@pytest.fixture
+def stub_locations():
+    processes = []
+
+    def start(*args) -> str:
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, STUB_SERVER, "--port", str(port), *args],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        processes.append(process)
+        _wait_for_port(port, process)
+        return f"http://127.0.0.1:{port}/api/ubicaciones"
+
+    yield start
+
+    for process in processes:
+        process.terminate()
+        process.wait(timeout=5)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from app.utils import http_client as http_client_module
+from app.utils import locations_cache as locations_module
+from app.utils.http_client import http_client, CircuitBreaker, OPEN
+from app.utils.locations_cache import LocationsCache, UpstreamError
+
+
+# Cada prueba usa su propio event loop: el cliente compartido se cierra al terminar
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await http_client.close()
+    return asyncio.run(wrapper())
+
+
+@pytest.fixture(autouse=True)
+def isolated_client(monkeypatch):
+    # Sin reintentos ni esperas, y circuit breakers nuevos en cada prueba
+    monkeypatch.setattr(http_client_module, "HTTP_CLIENT_RETRIES", 0)
+    monkeypatch.setattr(http_client, "_breakers", {})
+    monkeypatch.setattr(locations_module, "LOCATIONS_RETRY_AFTER", 0)
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    calls = []
+    fetch = locations_module.fetch_locations
+
+    async def counted():
+        calls.append(1)
+        return await fetch()
+
+    monkeypatch.setattr(locations_module, "fetch_locations", counted)
+    return calls
+
+
+def test_cache_hit_does_not_call_service(stub_locations, monkeypatch, tmp_path, fetch_calls):
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", stub_locations("--cities", "30"))
+    cache = LocationsCache(ttl=60, snapshot_path=str(tmp_path / "ubicaciones.json"))
+
+    async def scenario():
+        first = await cache.get()
+        second = await cache.get()
+        return first, second
+
+    first, second = run(scenario())
+
+    assert len(fetch_calls) == 1
+    assert second is first
+    assert first.total == 30
+    assert json.loads(first.flat)["total"] == 30
+    # La respuesta válida queda guardada en disco como copia de respaldo
+    assert json.loads((tmp_path / "ubicaciones.json").read_text(encoding="utf-8"))["data"][0]["id_ciudad"] == 1
+
+
+def test_tree_groups_country_department_city(stub_locations, monkeypatch, tmp_path):
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", stub_locations("--cities", "6"))
+    cache = LocationsCache(snapshot_path=str(tmp_path / "ubicaciones.json"))
+
+    tree = json.loads(run(cache.get()).tree)
+
+    assert tree["total"] == 6
+    assert [country["pais"] for country in tree["paises"]] == ["Pais 1", "Pais 2", "Pais 3"]
+    # El servidor de prueba asigna la ciudad i al país i % 3 + 1 y al departamento i % 25 + 1
+    pais_2 = tree["paises"][1]
+    assert pais_2["departamentos"] == [
+        {"departamento": "Departamento 2", "ciudades": [{"id_ciudad": 1, "ciudad": "Ciudad 1"}]},
+        {"departamento": "Departamento 5", "ciudades": [{"id_ciudad": 4, "ciudad": "Ciudad 4"}]},
+    ]
+    cities = [city["id_ciudad"] for country in tree["paises"]
+              for department in country["departamentos"] for city in department["ciudades"]]
+    assert sorted(cities) == [1, 2, 3, 4, 5, 6]
+
+
+def test_open_circuit_serves_saved_copy(stub_locations, monkeypatch, tmp_path):
+    snapshot_path = str(tmp_path / "ubicaciones.json")
+
+    # Una primera respuesta correcta deja la copia en disco
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", stub_locations("--cities", "12"))
+    run(LocationsCache(snapshot_path=snapshot_path).get())
+
+    # El servicio pasa a responder siempre 503 y el breaker se abre al primer fallo
+    failing_url = stub_locations("--cities", "12", "--fail-rate", "1", "--fail-status", "503")
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", failing_url)
+    host = failing_url.split("/")[2]
+    breaker = http_client._breakers[host] = CircuitBreaker(host, max_failures=1, reset_timeout=60)
+
+    async def scenario():
+        cache = LocationsCache(snapshot_path=snapshot_path)
+        failed = await cache.get()
+        assert breaker.state == OPEN
+        # Con el circuito abierto ya no se llama al servicio
+        with pytest.raises(UpstreamError) as error:
+            await locations_module.fetch_locations()
+        assert error.value.status_code == 503
+        # Una instancia sin copia en memoria recurre a la guardada en disco
+        reopened = await LocationsCache(snapshot_path=snapshot_path).get()
+        return failed, reopened
+
+    failed, reopened = run(scenario())
+
+    assert failed.total == 12
+    assert reopened.total == 12
+    assert breaker.failures == 1
+
+
+def test_open_circuit_without_copy_returns_503(monkeypatch, tmp_path):
+    url = "http://127.0.0.1:9/api/ubicaciones"
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", url)
+    # Circuito abierto por un fallo anterior: no se llega a intentar la conexión
+    breaker = http_client._breakers["127.0.0.1:9"] = CircuitBreaker("127.0.0.1:9", max_failures=1, reset_timeout=60)
+    breaker.record_failure()
+
+    cache = LocationsCache(snapshot_path=str(tmp_path / "no_existe.json"))
+    with pytest.raises(HTTPException) as error:
+        run(cache.get())
+
+    assert error.value.status_code == 503
+
+
+def test_malformed_rows_fall_back_to_saved_copy(stub_locations, monkeypatch, tmp_path):
+    snapshot_path = str(tmp_path / "ubicaciones.json")
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", stub_locations("--cities", "8"))
+    run(LocationsCache(snapshot_path=snapshot_path).get())
+
+    # Una fila sin "pais" se rechaza como respuesta inválida y se usa la copia en disco
+    monkeypatch.setattr(locations_module, "NODE_SERVICE_URL", stub_locations("--cities", "5", "--malformed"))
+    with pytest.raises(UpstreamError) as error:
+        run(locations_module.fetch_locations())
+    assert error.value.status_code == 502
+
+    fallback = run(LocationsCache(snapshot_path=snapshot_path).get())
+    assert fallback.total == 8
+
+    # Sin copia guardada la petición termina en 502, no en un error interno
+    with pytest.raises(HTTPException) as error:
+        run(LocationsCache(snapshot_path=str(tmp_path / "no_existe.json")).get())
+    assert error.value.status_code == 502
+